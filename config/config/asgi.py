@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Menu seeding lives outside the request path; just make sure it happened,
+# then warm the homepage menu fragment before the first request.
+from restaurant.catalog import check_default_menu, prerender_menu_fragments  # noqa: E402
+
+check_default_menu()
+prerender_menu_fragments()
@@ -10,8 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import sys
 from pathlib import Path
-from django.contrib.sessions.backends.db import SessionStore
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +26,9 @@ SECRET_KEY = 'django-insecure-mt3u-vm_#irm@$so(8)-pw9a!&ro(ql3ha=u@ycg(3gxeen8&o
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# `manage.py test` runs with DEBUG off and without collectstatic
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = []
 
 
@@ -41,35 +44,18 @@ INSTALLED_APPS = [
     'restaurant',  # <-- Add this line
 ]
 
-# Update these session settings
+# Admin and storefront sessions use separate cookies; see
+# restaurant.middleware.DualSessionMiddleware
 SESSION_COOKIE_NAME = 'sessionid'  # Default cookie name for main site
+SESSION_COOKIE_PATH = '/'
 ADMIN_SESSION_COOKIE_NAME = 'admin_sessionid'  # Separate cookie name for admin
 ADMIN_SESSION_COOKIE_PATH = '/admin/'  # Restrict admin cookie to admin paths
 
-# Add custom middleware to handle admin sessions
-class AdminSessionMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        # If accessing admin pages, use admin session
-        if request.path.startswith('/admin/'):
-            request.session = SessionStore(session_key=None)
-            request.session.cookie_name = ADMIN_SESSION_COOKIE_NAME
-            
-        response = self.get_response(request)
-        
-        # Set appropriate cookie path for admin sessions
-        if request.path.startswith('/admin/'):
-            if response.cookies.get(ADMIN_SESSION_COOKIE_NAME):
-                response.cookies[ADMIN_SESSION_COOKIE_NAME]['path'] = ADMIN_SESSION_COOKIE_PATH
-        
-        return response
-
 MIDDLEWARE = [
-    'config.settings.AdminSessionMiddleware',  # Add this line at the start
+    'restaurant.middleware.PerformanceMetricsMiddleware',  # Outermost, so it times everything below
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',  # Serves STATIC_ROOT with far-future headers
+    'restaurant.middleware.DualSessionMiddleware',  # Replaces SessionMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -84,7 +70,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock Django templates plus render timing for the metrics middleware
+        'BACKEND': 'restaurant.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'restaurant' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -109,10 +96,75 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than an in-memory database, so tests that book from
+        # several threads (separate connections) share one database
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 
+# Cache
+# The menu version counter lives here; point this at a shared backend
+# (memcached/redis) in production so a menu edit invalidates every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+# Session storage (compare with `python manage.py benchmark_sessions`):
+#   'restaurant.session_backends.write_behind' - cache first, batched DB writes
+#   'restaurant.session_backends.hybrid' - signed cookie until login, then write_behind
+#   'django.contrib.sessions.backends.db' - the Django default
+# Both custom engines need a cache shared by all workers: with a
+# per-process cache a logout in one worker would not reach the others.
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+else:
+    SESSION_ENGINE = 'restaurant.session_backends.write_behind'
+SESSION_WRITE_BEHIND_SECONDS = 5  # How often queued session writes reach the DB
+
+
+# Order status events
+# LocalBroker fans out within one process. With several ASGI workers use
+# 'restaurant.events.RedisBroker' with OPTIONS {'url': 'redis://...'}.
+
+ORDER_EVENTS_BROKER = {
+    'BACKEND': 'restaurant.events.LocalBroker',
+}
+
+
+# Performance metrics
+# /metrics is served to staff users and to scrapers from these addresses.
+
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+
+# Authentication
+# Users sign in with their username or email. Failed attempts are counted
+# in the cache per client address and per account; once a limit is hit
+# further attempts are refused until the window expires.
+
+AUTHENTICATION_BACKENDS = ['restaurant.backends.UsernameOrEmailBackend']
+
+LOGIN_THROTTLE = {
+    'IP_LIMIT': 20,
+    'ACCOUNT_LIMIT': 5,
+    'WINDOW': 5 * 60,  # seconds
+    # Behind a reverse proxy every request comes from the proxy's address;
+    # name the header it puts the client address in, and how many proxies
+    # append to it, or all clients share one failure bucket.
+    'CLIENT_IP_HEADER': None,  # e.g. 'HTTP_X_FORWARDED_FOR'
+    'TRUSTED_PROXIES': 1,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -158,6 +210,30 @@ STATICFILES_DIRS = [
 # Add STATIC_ROOT setting
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# `python manage.py build_assets` moves inline template CSS/JS into static
+# bundles and runs collectstatic, which writes content-hashed copies, a
+# manifest and gzip (plus brotli, when the brotli package is installed)
+# variants. WhiteNoise serves the hashed files as immutable for a year.
+# With DEBUG off every {% static %} needs the manifest, so deploys must run
+# collectstatic (or build_assets); tests use the plain storage instead.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Uploaded files (menu photos and their resized copies)
+# Derivatives under media/menu/derived/ are named by content hash; serve
+# them with far-future immutable caching in production.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -170,6 +246,19 @@ LOGIN_URL = '/login/'
 STRIPE_PUBLISHABLE_KEY = 'your_publishable_key'
 STRIPE_SECRET_KEY = 'your_secret_key'
 STRIPE_WEBHOOK_SECRET = 'your_webhook_secret'
+# None talks to Stripe; 'http://127.0.0.1:12111' talks to `manage.py fake_payment_server`
+STRIPE_API_BASE = None
+
+# Payment client (restaurant.payments)
+PAYMENT_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,         # seconds
+    'READ_TIMEOUT': 8.0,            # seconds
+    'MAX_RETRIES': 2,               # network errors, 429 and 5xx only
+    'BACKOFF_SECONDS': 0.2,         # jittered, doubling per retry
+    'POOL_SIZE': 10,                # keep-alive connections per worker
+    'BREAKER_THRESHOLD': 5,         # consecutive failures that open the circuit
+    'BREAKER_RESET_SECONDS': 30,    # how long it stays open before a trial call
+}
 
 # Email Settings
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
@@ -181,8 +270,32 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For developm
 # EMAIL_HOST_USER = 'your-email@gmail.com'
 # EMAIL_HOST_PASSWORD = 'your-app-password'
 
+# Outbox
+# Emails and other side effects are written to the OutboxMessage table in
+# the request's transaction and sent by `python manage.py run_outbox`.
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BACKOFF_SECONDS = 30       # Doubles with every failed attempt...
+OUTBOX_RETRY_BACKOFF_MAX_SECONDS = 3600  # ...up to this
+OUTBOX_LEASE_SECONDS = 300  # A claimed message comes due again if its worker dies
+
 # Restaurant Info
 RESTAURANT_NAME = 'Grilli Restaurant'
 RESTAURANT_EMAIL = 'noreply@grilli.com'
 RESTAURANT_PHONE = '(555) 123-4567'
 RESTAURANT_ADDRESS = '123 Restaurant Street, New York, NY 10001'
+
+# Seed the default menu fixture when a worker boots and finds it missing.
+# Otherwise run `python manage.py seed_menu` once after migrating.
+MENU_SEED_ON_STARTUP = False
+
+# Reservation capacity
+# Capacity is the total seats of active DiningTables. Bookings start on a
+# RESERVATION_SLOT_MINUTES grid within each service period (first and last
+# seating) and hold their covers for RESERVATION_SEATING_MINUTES.
+RESERVATION_SLOT_MINUTES = 30
+RESERVATION_SEATING_MINUTES = 90
+RESERVATION_SERVICE_PERIODS = [
+    ('11:30', '14:00'),  # Lunch
+    ('17:30', '21:00'),  # Dinner
+]
@@ -1,10 +1,17 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Case, IntegerField, When
+from django.utils import timezone
+from .admin_lists import ScalableListMixin
+from .catalog import get_menu_snapshot
 from .models import (
     Reservation, 
+    DiningTable,
     MenuItem, 
-    # MenuItemOption,
+    MenuItemOption,
     Order,
-    OrderItem
+    OrderItem,
+    OutboxMessage
 )
 
 @admin.register(MenuItem)
@@ -12,26 +19,108 @@ class MenuItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price')
     list_filter = ('category',)
     search_fields = ('name', 'description')
+    exclude = ('image_variants',)
 
-# @admin.register(MenuItemOption)
-# class MenuItemOptionAdmin(admin.ModelAdmin):
-#     list_display = ('menu_item', 'name', 'required')
-#     list_filter = ('required',)
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            # Autocomplete pages this queryset as is, so it needs an order
+            return (queryset if queryset.ordered else queryset.order_by('-pk')), False
+        # The storefront's in-memory search index rather than icontains scans
+        matches = get_menu_snapshot().search_index.search(search_term, limit=None)
+        ids = [item.id for item, _ in matches]
+        if not ids:
+            return queryset.none(), False
+        # Keep the index's ranking; a clicked column still sorts first
+        rank = Case(*[When(id=pk, then=position) for position, pk in enumerate(ids)],
+                    output_field=IntegerField())
+        return queryset.filter(id__in=ids).order_by(rank), False
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if 'photo' in form.changed_data:
+                # Resizing is slow; the outbox worker builds the derivatives
+                OutboxMessage.enqueue('menu_item_images', menu_item_id=obj.id)
+
+@admin.register(MenuItemOption)
+class MenuItemOptionAdmin(ScalableListMixin, admin.ModelAdmin):
+    list_display = ('menu_item', 'name', 'required')
+    list_filter = ('required',)
+    list_select_related = ('menu_item',)
+    autocomplete_fields = ('menu_item',)
+
+def make_status_action(new_status, label):
+    """Admin action that moves the selected orders to new_status in one UPDATE"""
+    def action(modeladmin, request, queryset):
+        updated, rejected = Order.bulk_update_status(
+            queryset.values_list('id', flat=True), new_status
+        )
+        if updated:
+            modeladmin.message_user(request, f"{len(updated)} order(s) marked as {label}.", messages.SUCCESS)
+        if rejected:
+            modeladmin.message_user(
+                request,
+                f"Skipped order(s) {', '.join(map(str, rejected))}: cannot move to {label} from their current status.",
+                messages.WARNING,
+            )
+    action.__name__ = f'mark_{new_status}'
+    action.short_description = f"Mark selected orders as {label}"
+    return action
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ScalableListMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'status', 'total_amount', 'created_at')
-    list_filter = ('status',)
-    search_fields = ('user__username', 'id')
-    date_hierarchy = 'created_at'
+    # Relative date ranges rather than date_hierarchy, whose year/month
+    # links need a DISTINCT over every order's created_at
+    list_filter = ('status', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__username',)
+    search_help_text = "Order number or exact username"
+    # Maintained by the cart and the sales rollups, never by hand
+    readonly_fields = ('item_count', 'rolled_up')
+    actions = [
+        make_status_action(status, label)
+        for status, label in Order.STATUS_CHOICES
+        if Order.allowed_sources(status)
+    ]
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip().lstrip('#')
+        if not search_term:
+            return queryset, False
+        # Indexed equality lookups instead of icontains scans over every order
+        if search_term.isdigit():
+            return queryset.filter(id=int(search_term)), False
+        return queryset.filter(user__username=search_term), False
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(ScalableListMixin, admin.ModelAdmin):
     list_display = ('order', 'menu_item', 'quantity', 'item_total')
     list_filter = ('order__status',)
+    list_select_related = ('order__user', 'menu_item')
+    raw_id_fields = ('order',)
+    autocomplete_fields = ('menu_item',)
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ('name', 'date', 'time', 'guests')
     list_filter = ('date',)
     search_fields = ('name', 'phone')
+
+@admin.register(DiningTable)
+class DiningTableAdmin(admin.ModelAdmin):
+    list_display = ('name', 'seats', 'is_active')
+    list_filter = ('is_active',)
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected messages now")
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status='sent').update(status='pending', available_at=timezone.now())
+        self.message_user(request, f"{count} message(s) queued for retry.", messages.SUCCESS)
@@ -0,0 +1,167 @@
+"""
+Admin change lists that stay fast on tables with millions of rows.
+
+The stock change list runs COUNT(*) twice per page (filtered and full)
+and pages with OFFSET, both of which scan further the deeper the table
+gets. ScalableListMixin swaps in:
+
+* EstimatedCountPaginator: an unfiltered count comes from the database's
+  own statistics (or MAX(pk) on SQLite), a filtered count stops at
+  COUNT_LIMIT rows;
+* KeysetChangeList: with the default newest-first ordering, pages are
+  read with `pk < cursor LIMIT n` and linked with Older/Newer cursors
+  instead of page numbers. Sorting by a column falls back to the stock
+  numbered pages (with the cheap count).
+"""
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+OLDER_VAR = 'before'
+NEWER_VAR = 'after'
+CURSOR_VARS = (OLDER_VAR, NEWER_VAR)
+
+# Tables at least this big get an estimated total instead of COUNT(*)
+ESTIMATE_THRESHOLD = 100_000
+# Filtered counts stop here and are shown as "10000+"
+COUNT_LIMIT = 10_000
+
+
+def estimated_row_count(model, using):
+    """
+    Approximate row count of a model's table without scanning it, or None
+    when the backend has no cheap estimate.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    elif connection.vendor == 'mysql':
+        sql = (
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s"
+        )
+    else:
+        sql = None
+    row = None
+    if sql:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    if row and row[0] is not None and row[0] >= 0:
+        return row[0]
+    if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+        # Auto ids only grow, so the highest one is a one-row index lookup
+        # that overstates the count by the rows deleted so far
+        return model._default_manager.using(using).aggregate(top=Max('pk'))['top'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count never scans more than COUNT_LIMIT rows"""
+
+    estimated = False
+    capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                self.estimated = True
+                return estimate
+        count = queryset.order_by()[:COUNT_LIMIT].count()
+        self.capped = count >= COUNT_LIMIT
+        return count
+
+    @property
+    def count_label(self):
+        if self.estimated:
+            return f"about {self.count:,}"
+        if self.capped:
+            return f"{self.count:,}+"
+        return f"{self.count:,}"
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that pages newest-first by primary key with a cursor
+    (?before=<pk> / ?after=<pk>) rather than an OFFSET.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = {var: request.GET.get(var) for var in CURSOR_VARS if request.GET.get(var)}
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in CURSOR_VARS:
+            lookup_params.pop(var, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # A new filter, search or sort starts from the newest rows again
+        new_params = {**{var: None for var in CURSOR_VARS}, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def keyset(self):
+        # The admin repeats the default ordering, e.g. ('-pk', '-pk')
+        ordering = set(self.queryset.query.order_by)
+        return (
+            not self.list_editable
+            and not self.show_all
+            and bool(ordering)
+            and ordering <= {'-pk', f'-{self.lookup_opts.pk.name}'}
+        )
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset
+        try:
+            older = int(self.cursor[OLDER_VAR]) if OLDER_VAR in self.cursor else None
+            newer = int(self.cursor[NEWER_VAR]) if NEWER_VAR in self.cursor else None
+        except ValueError:
+            older = newer = None
+        if newer is not None:
+            queryset = queryset.filter(pk__gt=newer).reverse()
+        elif older is not None:
+            queryset = queryset.filter(pk__lt=older)
+        rows = list(queryset[:self.list_per_page + 1])
+        more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if newer is not None:
+            rows.reverse()
+
+        self.result_list = rows
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = bool(rows)
+        self.can_show_all = False
+        self.paginator = paginator
+        self.older_url = self.newer_url = None
+        if rows and (more if newer is None else True):
+            self.older_url = self.get_query_string({OLDER_VAR: rows[-1].pk})
+        if rows and (more if newer is not None else older is not None):
+            self.newer_url = self.get_query_string({NEWER_VAR: rows[0].pk})
+        self.multi_page = bool(self.older_url or self.newer_url)
+
+
+class ScalableListMixin:
+    """
+    ModelAdmin mixin for big tables: estimated counts, no second full
+    count, and keyset pages when listed newest-first.
+    """
+    change_list_template = 'admin/keyset_change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-pk',)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,118 @@
+"""
+Reservation availability: remaining covers per time slot for a day.
+
+A day's bookings are read with one aggregate query (covers grouped by
+start time) and cached under the reservation version, which any change
+to a Reservation or DiningTable bumps.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+
+from .models import DiningTable, Reservation
+from .versioning import bump_version, get_version
+
+RESERVATION_VERSION_CACHE_KEY = 'restaurant:reservation_version'
+AVAILABILITY_TIMEOUT = 60 * 60
+
+
+def bump_reservation_version():
+    bump_version(RESERVATION_VERSION_CACHE_KEY)
+
+
+def _minutes(value):
+    """Minutes since midnight for a time or an 'HH:MM' string"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%H:%M').time()
+    return value.hour * 60 + value.minute
+
+
+def slot_times():
+    """Bookable start times, on the slot grid within each service period"""
+    step = settings.RESERVATION_SLOT_MINUTES
+    slots = []
+    for first, last in settings.RESERVATION_SERVICE_PERIODS:
+        slots.extend(range(_minutes(first), _minutes(last) + 1, step))
+    return [time(minute // 60, minute % 60) for minute in slots]
+
+
+def _compute_capacity():
+    return DiningTable.objects.filter(is_active=True).aggregate(seats=Sum('seats'))['seats']
+
+
+def _covers_by_start(day, exclude_id=None):
+    """{start minute: covers} for a day's bookings, in one aggregate query"""
+    reservations = Reservation.objects.filter(date=day)
+    if exclude_id is not None:
+        reservations = reservations.exclude(id=exclude_id)
+    rows = reservations.values('time').annotate(covers=Sum('guests'))
+    covers = {}
+    for row in rows:
+        start = _minutes(row['time'])
+        covers[start] = covers.get(start, 0) + row['covers']
+    return covers
+
+
+def _remaining_at(start, covers, capacity):
+    """
+    Covers still free for a booking starting at `start`. Occupancy only
+    rises when a booking starts, so its peak over the seating is found at
+    `start` or at a booking start inside the seating.
+    """
+    length = settings.RESERVATION_SEATING_MINUTES
+
+    def seated(at):
+        return sum(guests for begin, guests in covers.items() if begin <= at < begin + length)
+
+    points = [start] + [begin for begin in covers if start < begin < start + length]
+    return max(capacity - max(seated(at) for at in points), 0)
+
+
+def day_availability(day):
+    """
+    Return (capacity, {slot time: remaining covers}) for a day. Capacity
+    is None when no tables are configured, in which case nothing is limited.
+    """
+    version = get_version(RESERVATION_VERSION_CACHE_KEY)
+    key = f'restaurant:availability:{version}:{day.isoformat()}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    capacity = _compute_capacity()
+    if capacity is None:
+        result = (None, {slot: None for slot in slot_times()})
+    else:
+        covers = _covers_by_start(day)
+        result = (capacity, {slot: _remaining_at(_minutes(slot), covers, capacity) for slot in slot_times()})
+    cache.set(key, result, AVAILABILITY_TIMEOUT)
+    return result
+
+
+def _lock_capacity():
+    """
+    Seats at the active tables (None without any), locking them until the
+    transaction ends so concurrent bookings check and write one at a time.
+    """
+    if connection.vendor == 'sqlite':
+        # No row locks on SQLite: a write takes the database write lock now,
+        # as BEGIN IMMEDIATE would, rather than at the booking's insert
+        DiningTable.objects.filter(is_active=True).update(is_active=True)
+    seats = list(DiningTable.objects.select_for_update().filter(is_active=True).values_list('seats', flat=True))
+    return sum(seats) if seats else None
+
+
+def has_capacity(day, start, guests, exclude_id=None):
+    """
+    Check a booking against the live tables (not the cache). Call it in
+    the transaction that writes the reservation: it locks the tables, so
+    a concurrent booking waits for that write before checking.
+    """
+    capacity = _lock_capacity()
+    if capacity is None:
+        return True
+    covers = _covers_by_start(day, exclude_id=exclude_id)
+    return _remaining_at(_minutes(start), covers, capacity) >= guests
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+
+UserModel = get_user_model()
+
+
+def _throttle_settings():
+    return {
+        'IP_LIMIT': 20,        # failed logins per client address per window
+        'ACCOUNT_LIMIT': 5,    # failed logins per username/email per window
+        'WINDOW': 5 * 60,      # seconds
+        'CLIENT_IP_HEADER': None,  # e.g. 'HTTP_X_FORWARDED_FOR' behind a proxy
+        'TRUSTED_PROXIES': 1,  # proxies that append to CLIENT_IP_HEADER
+        **getattr(settings, 'LOGIN_THROTTLE', {}),
+    }
+
+
+def client_ip(request):
+    """
+    The client's address. Behind a reverse proxy REMOTE_ADDR is the proxy
+    for every client, so with CLIENT_IP_HEADER set the address is read from
+    that header instead: the entry added by the outermost of TRUSTED_PROXIES
+    proxies, counted from the right, since anything further left is
+    whatever the client sent.
+    """
+    limits = _throttle_settings()
+    header = limits['CLIENT_IP_HEADER']
+    if header:
+        forwarded = [part.strip() for part in request.META.get(header, '').split(',') if part.strip()]
+        if len(forwarded) >= limits['TRUSTED_PROXIES']:
+            return forwarded[-limits['TRUSTED_PROXIES']]
+    return request.META.get('REMOTE_ADDR')
+
+
+def _throttle_keys(request, identifier):
+    keys = []
+    address = client_ip(request) if request is not None else None
+    if address:
+        keys.append(('IP_LIMIT', f"restaurant:login:ip:{address}"))
+    if identifier:
+        keys.append(('ACCOUNT_LIMIT', f"restaurant:login:account:{identifier.strip().lower()}"))
+    return keys
+
+
+def login_throttled(request, identifier):
+    """True when the client or the account has used up its failed attempts"""
+    limits = _throttle_settings()
+    keys = _throttle_keys(request, identifier)
+    counts = cache.get_many([key for _, key in keys])
+    return any(counts.get(key, 0) >= limits[limit] for limit, key in keys)
+
+
+def record_login_failure(request, identifier):
+    window = _throttle_settings()['WINDOW']
+    for _, key in _throttle_keys(request, identifier):
+        cache.add(key, 0, window)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add and incr; start a new window
+            cache.set(key, 1, window)
+
+
+def reset_login_failures(identifier):
+    cache.delete(f"restaurant:login:account:{identifier.strip().lower()}")
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Authenticate by username or email with a single indexed query and at
+    most one password hash, refusing throttled clients before hashing.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        if login_throttled(request, username):
+            # Stops the other backends too, without spending a hash
+            raise PermissionDenied("Too many failed login attempts")
+
+        candidates = list(
+            UserModel._default_manager.filter(Q(username=username) | Q(email=username))[:3]
+        )
+        # An exact username wins; an email only counts when it is unambiguous
+        user = next((c for c in candidates if c.get_username() == username), None)
+        if user is None and len(candidates) == 1:
+            user = candidates[0]
+
+        if user is None:
+            # Run the hasher anyway so unknown accounts take as long as known ones
+            UserModel().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            reset_login_failures(username)
+            return user
+        record_login_failure(request, username)
+        return None
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+
+# Badge counts are rewritten on every cart change, so the timeout only
+# bounds how long an orphaned entry can linger.
+CART_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def cart_count_key(user_id):
+    return f'restaurant:cart_count:{user_id}'
+
+
+def get_cached_cart_count(user_id):
+    """Return the cached badge count for a user, or None on a miss"""
+    return cache.get(cart_count_key(user_id))
+
+
+def set_cached_cart_count(user_id, count):
+    cache.set(cart_count_key(user_id), count, CART_COUNT_TIMEOUT)
+
+
+def clear_cached_cart_count(user_id):
+    cache.delete(cart_count_key(user_id))
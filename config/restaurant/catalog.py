@@ -0,0 +1,178 @@
+import json
+import logging
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import DatabaseError, transaction
+from django.template.loader import render_to_string
+from django.utils.functional import cached_property
+
+from .models import MenuItem
+from .search import MenuSearchIndex
+from .versioning import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MENU_FIXTURE = Path(__file__).resolve().parent / 'data' / 'default_menu.json'
+
+MENU_VERSION_CACHE_KEY = 'restaurant:menu_version'
+
+# The homepage menu markup, cached per menu version by index.html's {% cache %} tag
+HOME_MENU_FRAGMENT = 'home_menu'
+HOME_MENU_TEMPLATE = 'restaurant/home_menu.html'
+MENU_FRAGMENT_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def load_menu_fixture(path=DEFAULT_MENU_FIXTURE):
+    """Read a versioned menu fixture and return (version, items)"""
+    with open(path, encoding='utf-8') as fh:
+        data = json.load(fh)
+    return data['version'], data['items']
+
+
+def missing_menu_items(items):
+    """Return the fixture items whose names are not yet in the database"""
+    names = [item['name'] for item in items]
+    existing = set(MenuItem.objects.filter(name__in=names).values_list('name', flat=True))
+    return [item for item in items if item['name'] not in existing]
+
+
+def seed_default_menu(path=DEFAULT_MENU_FIXTURE):
+    """
+    Insert any fixture items that are missing, leaving existing rows
+    (and any edits made to them in the admin) untouched.
+    Returns (version, number of items created).
+    """
+    version, items = load_menu_fixture(path)
+    with transaction.atomic():
+        missing = missing_menu_items(items)
+        MenuItem.objects.bulk_create([
+            MenuItem(
+                name=item['name'],
+                category=item['category'],
+                price=Decimal(item['price']),
+                description=item['description'],
+                image=item['image'],
+            )
+            for item in missing
+        ])
+        if missing:
+            # bulk_create skips post_save, so invalidate the snapshot by hand
+            transaction.on_commit(bump_menu_version)
+    return version, len(missing)
+
+
+def check_default_menu():
+    """
+    Worker startup check: warn (or seed, if MENU_SEED_ON_STARTUP is set)
+    when the default menu has not been loaded yet.
+    """
+    try:
+        version, items = load_menu_fixture()
+        missing = missing_menu_items(items)
+        if not missing:
+            return
+        if getattr(settings, 'MENU_SEED_ON_STARTUP', False):
+            version, created = seed_default_menu()
+            logger.info("Seeded %d default menu items (fixture v%s)", created, version)
+        else:
+            logger.warning(
+                "%d default menu items (fixture v%s) are missing; run `manage.py seed_menu`",
+                len(missing), version,
+            )
+    except DatabaseError as exc:
+        logger.warning("Skipping default menu check: %s", exc)
+
+
+def get_menu_version():
+    """Return the current menu version shared through the cache"""
+    return get_version(MENU_VERSION_CACHE_KEY)
+
+
+def bump_menu_version():
+    """Invalidate every worker's menu snapshot"""
+    bump_version(MENU_VERSION_CACHE_KEY)
+
+
+class MenuSnapshot:
+    """
+    Read-only copy of the whole menu, grouped by category with options
+    attached. Built once per menu version and shared by all requests.
+    """
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.by_category = {code: [] for code, _ in MenuItem.CATEGORY_CHOICES}
+        self.menu_by_category = {}
+        for item in items:
+            options = list(item.options.all())
+            self.by_category.setdefault(item.category, []).append(item)
+            self.menu_by_category.setdefault(item.category, []).append({
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'price': item.price,
+                'image': item.image,
+                'image_variants': item.image_variants,
+                'options': options,
+            })
+
+    @cached_property
+    def search_index(self):
+        return MenuSearchIndex(self.items)
+
+    @classmethod
+    def build(cls, version):
+        items = list(MenuItem.objects.order_by('id').prefetch_related('options'))
+        return cls(version, items)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_menu_snapshot():
+    """Return the menu snapshot, rebuilding it only if the menu version moved"""
+    global _snapshot
+    version = get_menu_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = MenuSnapshot.build(version)
+        return _snapshot
+
+
+def home_menu_context(snapshot):
+    """Template context for the homepage menu, fragment cache key included"""
+    menu = snapshot.by_category
+    return {
+        'starters': menu['starters'],
+        'mains': menu['mains'],
+        'seafood': menu['seafood'],
+        'desserts': menu['desserts'],
+        'menu_version': snapshot.version,
+        'menu_fragment_timeout': MENU_FRAGMENT_TIMEOUT,
+    }
+
+
+def prerender_menu_fragments():
+    """
+    Worker startup: render the homepage menu fragment for the current
+    menu version into the cache, unless another worker already has, so
+    the first visitor after a deploy gets a cache hit.
+    """
+    try:
+        snapshot = get_menu_snapshot()
+        key = make_template_fragment_key(HOME_MENU_FRAGMENT, [snapshot.version])
+        if cache.get(key) is None:
+            # Stored exactly as the {% cache %} tag would store its contents
+            cache.set(key, render_to_string(HOME_MENU_TEMPLATE, home_menu_context(snapshot)), MENU_FRAGMENT_TIMEOUT)
+    except DatabaseError as exc:
+        logger.warning("Skipping menu fragment pre-render: %s", exc)
@@ -1,11 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cached_cart_count, set_cached_cart_count
 from .models import Order
 
+
+def get_cart_count(user):
+    """Number of items in the user's pending cart, served from the cache when possible"""
+    count = get_cached_cart_count(user.pk)
+    if count is None:
+        count = (Order.objects.filter(user=user, status='pending')
+                 .values_list('item_count', flat=True).first()) or 0
+        set_cached_cart_count(user.pk, count)
+    return count
+
+
 def cart_count(request):
+    # Lazy so pages that never show the badge never touch the cache or DB
     if request.user.is_authenticated:
-        try:
-            cart = Order.objects.get(user=request.user, status='pending')
-            count = sum(item.quantity for item in cart.items.all())
-            return {'cart_count': count}
-        except Order.DoesNotExist:
-            pass
-    return {'cart_count': 0} 
\ No newline at end of file
+        return {'cart_count': SimpleLazyObject(lambda: get_cart_count(request.user))}
+    return {'cart_count': 0}
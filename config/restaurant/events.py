@@ -0,0 +1,145 @@
+"""
+Order status fanout for the server-sent events stream.
+
+Every worker keeps an in-process hub of open tracking connections. A
+broker carries published events to the hub: LocalBroker for a single
+process, RedisBroker when several workers need to see each other's
+events. Pick one with the ORDER_EVENTS_BROKER setting.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'cancelled')
+
+
+def serialize_order_status(order):
+    """Status fields shared by the polling API and the event stream"""
+    return {
+        'id': order.id,
+        'status': order.status,
+        'confirmed_at': order.confirmed_at.isoformat() if order.confirmed_at else None,
+        'preparing_at': order.preparing_at.isoformat() if order.preparing_at else None,
+        'ready_at': order.ready_at.isoformat() if order.ready_at else None,
+        'completed_at': order.completed_at.isoformat() if order.completed_at else None,
+    }
+
+
+class OrderEventHub:
+    """In-process fanout from order ids to the queues of open connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, order_id):
+        """Register a queue for order_id on the running event loop"""
+        queue = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[order_id].add(entry)
+        return entry
+
+    def unsubscribe(self, order_id, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(order_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[order_id]
+
+    def dispatch(self, order_id, payload):
+        """Deliver payload to every local subscriber; safe to call from any thread"""
+        with self._lock:
+            entries = list(self._subscribers.get(order_id, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, payload)
+            except RuntimeError:
+                # The connection's loop has already shut down
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._subscribers.values())
+
+
+hub = OrderEventHub()
+
+
+class LocalBroker:
+    """Single-process broker: publishing is a direct hub dispatch"""
+
+    def __init__(self, hub, **options):
+        self.hub = hub
+
+    def publish(self, order_id, payload):
+        self.hub.dispatch(order_id, payload)
+
+
+class RedisBroker:
+    """
+    Shares events between workers over Redis pub/sub. Each worker runs
+    one listener thread that relays messages into its local hub.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, hub, url='redis://localhost:6379/0', channel='restaurant:order-status', **options):
+        import redis
+
+        self.hub = hub
+        self.channel = channel
+        self.client = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name='order-events', daemon=True)
+        self._listener.start()
+
+    def publish(self, order_id, payload):
+        self.client.publish(self.channel, json.dumps({'order_id': order_id, 'payload': payload}))
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                event = json.loads(message['data'])
+                self.hub.dispatch(event['order_id'], event['payload'])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Dropping malformed order event: %r", message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the broker configured by ORDER_EVENTS_BROKER, creating it once"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'ORDER_EVENTS_BROKER', {})
+                backend = import_string(config.get('BACKEND', 'restaurant.events.LocalBroker'))
+                _broker = backend(hub, **config.get('OPTIONS', {}))
+    return _broker
+
+
+def publish_order_status(order):
+    """Publish the order's current status once the surrounding transaction commits"""
+    order_id, payload = order.id, serialize_order_status(order)
+
+    def publish():
+        try:
+            get_broker().publish(order_id, payload)
+        except Exception:
+            # Tracking pages resync on reconnect; never fail the status change
+            logger.exception("Could not publish status for order %s", order_id)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,95 @@
+"""
+Responsive menu images.
+
+An uploaded MenuItem.photo is resized to each of DERIVATIVE_WIDTHS (never
+upscaled) in every DERIVATIVE_FORMATS format. Files are named after the
+hash of the original's bytes, so a rebuild skips work already done, an
+unchanged photo keeps its URLs, and the files can be cached forever.
+render_derivatives() touches only the filesystem, so it can run in a
+process pool; build_menu_images drives it there.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DERIVATIVE_WIDTHS = (320, 480, 800)
+DERIVATIVE_FORMATS = {
+    # extension: (Pillow format, save options)
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVED_DIR = 'menu/derived'
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def _write_atomic(path, image, image_format, options):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            image.save(fh, image_format, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_derivatives(source_path, media_root, force=False):
+    """
+    Write the derivatives of one original under media_root and return
+    {extension: {width: storage name}}. Existing files are kept unless force.
+    """
+    data = Path(source_path).read_bytes()
+    digest = content_hash(data)
+    with Image.open(BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        widths = [w for w in DERIVATIVE_WIDTHS if w < original.width] + [min(original.width, DERIVATIVE_WIDTHS[-1])]
+        variants = {extension: {} for extension in DERIVATIVE_FORMATS}
+        for width in sorted(set(widths)):
+            resized = None
+            for extension, (image_format, options) in DERIVATIVE_FORMATS.items():
+                name = f"{DERIVED_DIR}/{digest}-{width}.{extension}"
+                path = Path(media_root) / name
+                if force or not path.exists():
+                    if resized is None:
+                        height = round(original.height * width / original.width)
+                        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+                    _write_atomic(path, resized, image_format, options)
+                variants[extension][str(width)] = name
+    return variants
+
+
+def build_item_images(item, force=False):
+    """Render one item's derivatives in-process and save them on the item"""
+    if not item.photo:
+        variants = {}
+    else:
+        variants = render_derivatives(item.photo.path, settings.MEDIA_ROOT, force)
+    if variants != item.image_variants:
+        item.image_variants = variants
+        item.save(update_fields=['image_variants'])
+    return variants
+
+
+def build_menu_item_images(payload):
+    """Outbox handler: derivatives for a newly uploaded photo"""
+    from .models import MenuItem
+
+    item = MenuItem.objects.filter(id=payload['menu_item_id']).first()
+    if item is not None:
+        build_item_images(item)
+
+
+def srcset(variants, extension):
+    """'url 320w, url 480w, ...' for one format, smallest first"""
+    widths = sorted(variants.get(extension, {}).items(), key=lambda pair: int(pair[0]))
+    return ", ".join(f"{default_storage.url(name)} {width}w" for width, name in widths)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from restaurant.cart import clear_cached_cart_count
+from restaurant.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Order.item_count from the order lines. Run it once after "
+        "adding the column and before serving carts, which only apply deltas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Orders per UPDATE")
+
+    def handle(self, *args, **options):
+        quantities = (OrderItem.objects.filter(order=OuterRef('pk'))
+                      .values('order').annotate(total=Sum('quantity')).values('total'))
+        top = Order.objects.aggregate(top=Max('pk'))['top'] or 0
+        updated = 0
+        for start in range(0, top, options['batch_size']):
+            with transaction.atomic():
+                updated += Order.objects.filter(pk__gt=start, pk__lte=start + options['batch_size']).update(
+                    item_count=Coalesce(Subquery(quantities), Value(0)))
+        # Cart badges were cached from the old counts
+        for user_id in Order.objects.filter(status='pending', user__isnull=False).values_list('user_id', flat=True):
+            clear_cached_cart_count(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Recounted items on {updated} order(s)"))
@@ -0,0 +1,24 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurant.reporting import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly and per-item sales rollups from the orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rebuild sales from this local date (YYYY-MM-DD) onwards")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                day = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since must be YYYY-MM-DD")
+            since = datetime.combine(day, time.min, timezone.get_current_timezone())
+        hours, items = rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {hours} hourly and {items} daily item rollup rows"))
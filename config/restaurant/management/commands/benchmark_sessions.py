@@ -0,0 +1,95 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from restaurant.session_backends import write_behind
+
+ENGINES = [
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.signed_cookies',
+    'restaurant.session_backends.write_behind',
+    'restaurant.session_backends.hybrid',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request session overhead (time and SQL queries) across "
+        "session engines, for anonymous and logged-in visitors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--engines', nargs='*', default=ENGINES)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            self.stdout.write(
+                f"{'engine':<50}{'visitor':<11}{'read us':>10}{'write us':>10}"
+                f"{'read q':>8}{'write q':>8}"
+            )
+            for engine in options['engines']:
+                store_class = import_module(engine).SessionStore
+                for visitor, data in (('anonymous', {'theme': 'dark'}), ('logged-in', {SESSION_KEY: '1'})):
+                    row = self.measure(store_class, data, options['iterations'])
+                    self.stdout.write(
+                        f"{engine:<50}{visitor:<11}{row['read_us']:>10.1f}{row['write_us']:>10.1f}"
+                        f"{row['read_queries']:>8.2f}{row['write_queries']:>8.2f}"
+                    )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def measure(self, store_class, data, iterations):
+        """
+        Simulate requests against one session: a read-only request loads it,
+        a writing request loads, modifies and saves it. Write-behind flushes
+        are included in the write cost.
+        """
+        cache.clear()
+        session = store_class()
+        session.update(data)
+        session.save()
+        session_key = session.session_key
+
+        def read():
+            store = store_class(session_key)
+            store.get('theme')
+            return store
+
+        def write():
+            store = store_class(session_key)
+            store['counter'] = store.get('counter', 0) + 1
+            store.save()
+            return store
+
+        results = {}
+        for name, request in (('read', read), ('write', write)):
+            timings = []
+            with CaptureQueriesContext(connection) as captured:
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    store = request()
+                    timings.append((time.perf_counter() - start) * 1e6)
+                    session_key = store.session_key
+                start = time.perf_counter()
+                write_behind.queue.flush()
+                flush_us = (time.perf_counter() - start) * 1e6
+            results[f'{name}_us'] = statistics.median(timings) + flush_us / iterations
+            results[f'{name}_queries'] = len(captured.captured_queries) / iterations
+        return results
@@ -0,0 +1,194 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from restaurant.catalog import seed_default_menu
+from restaurant.models import MenuItem, Order
+from restaurant.session_backends import write_behind
+
+BUDGETS_FILE = Path(__file__).resolve().parents[2] / 'data' / 'view_budgets.json'
+
+
+class Scenario:
+    """One view to drive: setup() runs untimed before each request and returns its kwargs"""
+
+    def __init__(self, name, method, url, setup=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.setup = setup or (lambda bench: {})
+
+
+class Bench:
+    """Seeded data shared by the scenarios"""
+
+    def __init__(self, past_orders):
+        seed_default_menu()
+        self.menu_items = list(MenuItem.objects.order_by('id'))
+        self.user = User.objects.create_user('bench', 'bench@example.com', 'bench-password')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.past_orders = []
+        for n in range(past_orders):
+            order = Order.objects.create(
+                user=self.user,
+                status='completed',
+                total_amount=0,
+                pickup_time=timezone.now() - timedelta(days=n),
+            )
+            for item in self.menu_items[n % 5:n % 5 + 3]:
+                order.add_item(item, 1 + n % 3)
+            self.past_orders.append(order)
+        self.cart()
+
+    def cart(self):
+        """The user's pending cart, created with a few lines if checkout consumed it"""
+        cart, created = Order.objects.get_or_create(
+            user=self.user, status='pending', defaults={'total_amount': 0},
+        )
+        if created:
+            for item in self.menu_items[:3]:
+                cart.add_item(item, 1)
+        return cart
+
+
+def json_body(data):
+    return {'data': json.dumps(data), 'content_type': 'application/json'}
+
+
+def scenarios():
+    return [
+        Scenario('home', 'get', '/'),
+        Scenario('online_order', 'get', '/online-order/'),
+        Scenario('menu_search', 'get', '/api/menu/search/?q=grilled%20oct'),
+        Scenario('add_to_cart', 'post', '/add-to-cart/', lambda bench: json_body({
+            'menu_item_id': bench.menu_items[0].id, 'quantity': 1,
+        })),
+        Scenario('update_cart', 'post', '/update-cart/', lambda bench: json_body({
+            'item_id': bench.cart().items.values_list('id', flat=True).first(), 'quantity': 2,
+        })),
+        Scenario('view_cart', 'get', '/cart/', lambda bench: bench.cart() and {}),
+        Scenario('checkout', 'post', '/checkout/', lambda bench: bench.cart() and {'data': {
+            'pickup_time': (timezone.localtime() + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M'),
+            'special_instructions': '',
+        }}),
+        Scenario('order_history', 'get', '/order-history/'),
+        Scenario('order_status_api', 'get', lambda bench: f'/api/order-status/{bench.past_orders[0].id}/'),
+    ]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views with the test client against a seeded test database, "
+        "report latency percentiles and query counts, and fail on budget regressions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--past-orders', type=int, default=200,
+                            help="Order history size for the benchmark user")
+        parser.add_argument('--only', nargs='*', help="Run only these views")
+        parser.add_argument('--budgets', default=str(BUDGETS_FILE))
+        parser.add_argument('--update-budgets', action='store_true',
+                            help="Rewrite the budgets file from this run instead of checking it")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            results = self.run(options)
+        finally:
+            # Write queued sessions now; at exit the test database is gone
+            write_behind.queue.flush()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['update_budgets']:
+            self.write_budgets(options['budgets'], results)
+        else:
+            self.check_budgets(options['budgets'], results)
+
+    def run(self, options):
+        bench = Bench(options['past_orders'])
+        results = {}
+        self.stdout.write(f"{'view':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for scenario in scenarios():
+            if options['only'] and scenario.name not in options['only']:
+                continue
+            timings, queries = [], []
+            for n in range(options['warmup'] + options['iterations']):
+                kwargs = scenario.setup(bench)
+                url = scenario.url(bench) if callable(scenario.url) else scenario.url
+                # The debug query log is bounded; keep it from filling up across iterations
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = getattr(bench.client, scenario.method)(url, **kwargs)
+                    elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code >= 400:
+                    raise CommandError(f"{scenario.name}: HTTP {response.status_code} from {url}")
+                if n >= options['warmup']:
+                    timings.append(elapsed)
+                    queries.append(len(captured.captured_queries))
+            results[scenario.name] = {
+                'p50_ms': statistics.median(timings),
+                'p95_ms': percentile(timings, 95),
+                'p99_ms': percentile(timings, 99),
+                'queries': max(queries),
+            }
+            row = results[scenario.name]
+            self.stdout.write(
+                f"{scenario.name:<18}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['queries']:>9}"
+            )
+        return results
+
+    def check_budgets(self, path, results):
+        with open(path, encoding='utf-8') as fh:
+            budgets = json.load(fh)
+        failures = []
+        for name, row in results.items():
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f"{name}: no budget committed")
+                continue
+            if row['queries'] > budget['max_queries']:
+                failures.append(f"{name}: {row['queries']} queries > budget {budget['max_queries']}")
+            if row['p95_ms'] > budget['max_p95_ms']:
+                failures.append(f"{name}: p95 {row['p95_ms']:.2f} ms > budget {budget['max_p95_ms']} ms")
+        if failures:
+            raise CommandError("Budget regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All views within budget"))
+
+    def write_budgets(self, path, results):
+        # Query counts are exact; latency gets generous headroom for slower machines
+        budgets = {
+            name: {'max_queries': row['queries'], 'max_p95_ms': round(max(row['p95_ms'] * 4, 25))}
+            for name, row in results.items()
+        }
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(budgets, fh, indent=4)
+            fh.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Wrote budgets for {len(budgets)} views to {path}"))
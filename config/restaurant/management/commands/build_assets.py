@@ -0,0 +1,88 @@
+import re
+import textwrap
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+APP_DIR = Path(__file__).resolve().parents[2]
+TEMPLATE_DIR = APP_DIR / 'templates' / 'restaurant'
+BUNDLE_DIR = APP_DIR / 'static' / 'restaurant' / 'bundles'
+BUNDLE_URL = 'restaurant/bundles'
+
+# Bare <style>/<script> blocks only: anything with attributes (src, type,
+# nonce...) is left alone, as is any block using template syntax, since
+# it needs the request's context to render.
+INLINE_BLOCK = re.compile(r'<(style|script)>(.*?)</\1>', re.S)
+EXTENSIONS = {'style': 'css', 'script': 'js'}
+
+
+def extractable(body):
+    return body.strip() and '{%' not in body and '{{' not in body
+
+
+class Command(BaseCommand):
+    help = (
+        "Move inline <style>/<script> blocks out of the restaurant templates into "
+        "static bundles, then collectstatic: content-hashed names, a manifest, "
+        "and precompressed variants served with immutable cache headers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Only report templates with inline blocks; exit 1 if any")
+        parser.add_argument('--no-collect', action='store_true',
+                            help="Extract only; skip collectstatic")
+
+    def handle(self, *args, **options):
+        pending = {
+            path: [m for m in INLINE_BLOCK.finditer(path.read_text(encoding='utf-8')) if extractable(m.group(2))]
+            for path in sorted(TEMPLATE_DIR.glob('*.html'))
+        }
+        pending = {path: blocks for path, blocks in pending.items() if blocks}
+
+        if options['check']:
+            for path, blocks in pending.items():
+                self.stdout.write(f"{path.name}: {len(blocks)} inline block(s)")
+            if pending:
+                raise CommandError("Inline assets found; run `manage.py build_assets`")
+            self.stdout.write(self.style.SUCCESS("No inline assets"))
+            return
+
+        BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+        for path, blocks in pending.items():
+            self.extract(path, blocks)
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+    def extract(self, path, blocks):
+        source = path.read_text(encoding='utf-8')
+        parts, last = [], 0
+        for match in blocks:
+            tag, body = match.group(1), match.group(2)
+            name = self.bundle_name(path.stem, EXTENSIONS[tag])
+            (BUNDLE_DIR / name).write_text(textwrap.dedent(body).strip('\n') + '\n', encoding='utf-8')
+            url = f"{{% static '{BUNDLE_URL}/{name}' %}}"
+            if tag == 'style':
+                replacement = f'<link rel="stylesheet" href="{url}">'
+            else:
+                replacement = f'<script src="{url}"></script>'
+            parts += [source[last:match.start()], replacement]
+            last = match.end()
+            self.stdout.write(f"{path.name}: <{tag}> -> {BUNDLE_URL}/{name}")
+        source = self.ensure_load_static(''.join(parts) + source[last:])
+        path.write_text(source, encoding='utf-8')
+
+    def bundle_name(self, stem, extension):
+        name, n = f"{stem}.{extension}", 1
+        while (BUNDLE_DIR / name).exists():
+            n += 1
+            name = f"{stem}-{n}.{extension}"
+        return name
+
+    def ensure_load_static(self, source):
+        if re.search(r'{%\s*load\s+[^%]*\bstatic\b', source):
+            return source
+        extends = re.match(r'\s*{%\s*extends\s[^%]*%}\n?', source)
+        at = extends.end() if extends else 0
+        return source[:at] + '{% load static %}\n' + source[at:]
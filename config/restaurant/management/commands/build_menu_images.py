@@ -0,0 +1,71 @@
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurant.catalog import bump_menu_version
+from restaurant.images import content_hash, render_derivatives
+from restaurant.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Resize uploaded menu photos to responsive WebP/JPEG derivatives with "
+        "content-addressed names, across a process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--force', action='store_true', help="Re-encode derivatives that already exist")
+        parser.add_argument('--fetch-remote', action='store_true',
+                            help="First download the remote image of items without an uploaded photo")
+
+    def handle(self, *args, **options):
+        items = list(MenuItem.objects.order_by('id'))
+        if options['fetch_remote']:
+            for item in items:
+                if not item.photo and item.image:
+                    self.fetch(item)
+
+        with_photo = [item for item in items if item.photo]
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(
+                render_derivatives,
+                [item.photo.path for item in with_photo],
+                [str(settings.MEDIA_ROOT)] * len(with_photo),
+                [options['force']] * len(with_photo),
+            )
+            variants_by_id = dict(zip((item.id for item in with_photo), results))
+
+        changed = []
+        for item in items:
+            variants = variants_by_id.get(item.id, {})
+            if variants != item.image_variants:
+                item.image_variants = variants
+                changed.append(item)
+        with transaction.atomic():
+            MenuItem.objects.bulk_update(changed, ['image_variants'])
+            if changed:
+                # bulk_update skips post_save, so invalidate the menu by hand
+                transaction.on_commit(bump_menu_version)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(with_photo)} photo(s) processed, {len(changed)} item(s) updated"
+        ))
+
+    def fetch(self, item):
+        try:
+            with urllib.request.urlopen(item.image, timeout=15) as response:
+                data = response.read()
+        except OSError as e:
+            self.stderr.write(f"{item.name}: could not fetch {item.image}: {e}")
+            return
+        extension = PurePosixPath(urlparse(item.image).path).suffix or '.jpg'
+        item.photo.save(f"{content_hash(data)}{extension}", ContentFile(data), save=False)
+        MenuItem.objects.filter(id=item.id).update(photo=item.photo.name)
+        self.stdout.write(f"{item.name}: fetched {len(data)} bytes")
@@ -0,0 +1,101 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from django.core.management.base import BaseCommand
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Just enough of POST /v1/payment_intents, with injectable latency and failures"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so client connection pooling shows
+
+    def do_POST(self):
+        options = self.server.options
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+        delay = max(0.0, random.gauss(options['latency_ms'], options['jitter_ms'])) / 1000
+        roll = random.random()
+        if roll < options['hang_rate']:
+            delay = options['hang_seconds']
+        time.sleep(delay)
+
+        if self.path.rstrip('/') != '/v1/payment_intents':
+            return self.reply(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+        roll -= options['hang_rate']
+        if 0 <= roll < options['failure_rate']:
+            return self.reply(500, {'error': {'type': 'api_error', 'message': 'Injected failure'}})
+        roll -= options['failure_rate']
+        if 0 <= roll < options['rate_limit_rate']:
+            return self.reply(429, {'error': {'type': 'rate_limit_error', 'message': 'Injected rate limit'}})
+
+        key = self.headers.get('Idempotency-Key')
+        with self.server.lock:
+            intent = self.server.intents.get(key) if key else None
+            if intent is None:
+                intent = self.payment_intent(dict(parse_qsl(body)))
+                if key:
+                    self.server.intents[key] = intent
+        self.reply(200, intent)
+
+    def payment_intent(self, params):
+        intent_id = f"pi_fake_{uuid.uuid4().hex[:24]}"
+        return {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(params.get('amount', 0)),
+            'currency': params.get('currency', 'inr'),
+            'status': 'requires_payment_method',
+            'client_secret': f"{intent_id}_secret_{uuid.uuid4().hex[:16]}",
+            'metadata': {
+                name[len('metadata['):-1]: value
+                for name, value in params.items() if name.startswith('metadata[')
+            },
+            'livemode': False,
+        }
+
+    def reply(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Request-Id', f"req_fake_{uuid.uuid4().hex[:14]}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.options['verbosity'] > 1:
+            super().log_message(format, *args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local stand-in for the Stripe PaymentIntents API with configurable "
+        "latency and failure injection; set STRIPE_API_BASE to its address"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency-ms', type=float, default=150)
+        parser.add_argument('--jitter-ms', type=float, default=50)
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered 500")
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share answered 429")
+        parser.add_argument('--hang-rate', type=float, default=0.0,
+                            help="Share that stall for --hang-seconds (to trip client timeouts)")
+        parser.add_argument('--hang-seconds', type=float, default=30)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), FakeStripeHandler)
+        server.daemon_threads = True
+        server.options = options
+        server.lock = threading.Lock()
+        server.intents = {}
+        self.stdout.write(f"Fake payment server on http://127.0.0.1:{options['port']} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
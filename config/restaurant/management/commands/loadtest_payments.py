@@ -0,0 +1,60 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from restaurant.models import Order
+from restaurant.payments import PaymentClient, PaymentUnavailable
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent payment intent creation through the payment client "
+        "against a fake payment server and report latency and outcomes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api-base', default='http://127.0.0.1:12111')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = PaymentClient(
+            'sk_test_fake',
+            api_base=options['api_base'],
+            **{key.lower(): value for key, value in settings.PAYMENT_CLIENT.items()},
+        )
+
+        def checkout(n):
+            # Unsaved orders: only id, user_id and the total are sent
+            order = Order(id=n, user_id=1, total_amount=Decimal('100.00') + n)
+            start = time.perf_counter()
+            try:
+                client.create_payment_intent(order)
+                outcome = 'ok'
+            except PaymentUnavailable:
+                outcome = 'unavailable'
+            except stripe.StripeError as e:
+                outcome = type(e).__name__
+            return outcome, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(checkout, range(1, options['requests'] + 1)))
+        wall = time.perf_counter() - start
+
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        timings = sorted(ms for _, ms in results)
+        self.stdout.write(f"{len(results)} requests in {wall:.2f} s ({len(results) / wall:.1f}/s)")
+        self.stdout.write("outcomes: " + ", ".join(f"{name}={count}" for name, count in sorted(outcomes.items())))
+        self.stdout.write(
+            f"latency ms: p50={statistics.median(timings):.1f} "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:.1f} max={timings[-1]:.1f}"
+        )
+        self.stdout.write(f"circuit: {client.breaker.state}")
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from restaurant.outbox import make_executor, process_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox messages (order emails and other side effects)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--threads', type=int, default=4, help="Handlers run in parallel")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when nothing is due")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain what is due now and exit instead of polling")
+
+    def handle(self, *args, **options):
+        with make_executor(options['threads']) as executor:
+            try:
+                while True:
+                    outcomes = process_batch(executor, options['batch_size'])
+                    if outcomes:
+                        self.stdout.write(", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+                    elif options['once']:
+                        return
+                    else:
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping outbox worker")
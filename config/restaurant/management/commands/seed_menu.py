@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.catalog import DEFAULT_MENU_FIXTURE, seed_default_menu
+
+
+class Command(BaseCommand):
+    help = "Load the default menu items from the versioned menu fixture"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixture',
+            default=str(DEFAULT_MENU_FIXTURE),
+            help="Path to the menu fixture JSON file",
+        )
+
+    def handle(self, *args, **options):
+        version, created = seed_default_menu(options['fixture'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Menu fixture v{version}: {created} item(s) created"
+        ))
@@ -0,0 +1,138 @@
+"""
+Per-request performance metrics.
+
+A RequestMetrics object rides along in a context variable for the
+duration of each request. Database queries (through a connection
+execute wrapper) and template renders (through InstrumentedDjangoTemplates)
+add to it, and the middleware folds it into per-view histograms that
+/metrics exposes in the Prometheus text format. Histograms are per
+process; scrape every worker.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar('restaurant_request_metrics', default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper that times queries made during a request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - start
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing each top-level render"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by view name"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, view, value):
+        series = self._series.get(view)
+        if series is None:
+            series = self._series.setdefault(view, [[0] * len(self.buckets), 0, 0.0])
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for view, (counts, total, value_sum) in sorted(self._series.items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{view="{label}",le="+Inf"}} {total}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {total}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {value_sum}')
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            'grilli_request_duration_seconds', "Total handler time per view", SECONDS_BUCKETS)
+        self.db_seconds = Histogram(
+            'grilli_db_duration_seconds', "Time spent in SQL per request", SECONDS_BUCKETS)
+        self.db_queries = Histogram(
+            'grilli_db_queries', "SQL queries per request", COUNT_BUCKETS)
+        self.template_seconds = Histogram(
+            'grilli_template_render_seconds', "Template render time per request", SECONDS_BUCKETS)
+
+    def observe(self, view, metrics, total_seconds):
+        with self._lock:
+            self.request_seconds.observe(view, total_seconds)
+            self.db_seconds.observe(view, metrics.db_seconds)
+            self.db_queries.observe(view, metrics.queries)
+            self.template_seconds.observe(view, metrics.template_seconds)
+
+    def render(self):
+        with self._lock:
+            histograms = (self.request_seconds, self.db_seconds, self.db_queries, self.template_seconds)
+            return "\n".join(histogram.render() for histogram in histograms) + "\n"
+
+
+registry = Registry()
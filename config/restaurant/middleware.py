@@ -0,0 +1,126 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.exceptions import SessionInterrupted
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+from .metrics import finish_request, registry, start_request
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Time each request and report SQL, template and total time in a
+    Server-Timing header and the per-view histograms served at /metrics.
+    Put it first in MIDDLEWARE so the total covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total = metrics.elapsed()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, metrics, total)
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_seconds * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+
+class DualSessionMiddleware(SessionMiddleware):
+    """
+    Drop-in replacement for SessionMiddleware that keeps admin and
+    storefront sessions apart: requests under ADMIN_SESSION_COOKIE_PATH
+    use the ADMIN_SESSION_COOKIE_NAME cookie scoped to that path, all
+    others the regular session cookie. Each request loads its one
+    session lazily and writes it back only when it was modified.
+    """
+
+    def session_cookie(self, request):
+        """Return the (name, path) of the session cookie that serves this request"""
+        if request.path.startswith(settings.ADMIN_SESSION_COOKIE_PATH):
+            return settings.ADMIN_SESSION_COOKIE_NAME, settings.ADMIN_SESSION_COOKIE_PATH
+        return settings.SESSION_COOKIE_NAME, settings.SESSION_COOKIE_PATH
+
+    def process_request(self, request):
+        cookie_name, _ = self.session_cookie(request)
+        request.session = self.SessionStore(request.COOKIES.get(cookie_name))
+
+    def process_response(self, request, response):
+        # Mirrors SessionMiddleware.process_response with a per-request cookie
+        try:
+            accessed = request.session.accessed
+            modified = request.session.modified
+            empty = request.session.is_empty()
+        except AttributeError:
+            return response
+        cookie_name, cookie_path = self.session_cookie(request)
+        if cookie_name in request.COOKIES and empty:
+            response.delete_cookie(
+                cookie_name,
+                path=cookie_path,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        if accessed:
+            patch_vary_headers(response, ('Cookie',))
+        if not (modified or settings.SESSION_SAVE_EVERY_REQUEST) or empty:
+            return response
+        if request.session.get_expire_at_browser_close():
+            max_age = None
+            expires = None
+        else:
+            max_age = request.session.get_expiry_age()
+            expires = http_date(time.time() + max_age)
+        # Skip session save for 5xx responses
+        if response.status_code < 500:
+            try:
+                request.session.save()
+            except UpdateError:
+                raise SessionInterrupted(
+                    "The request's session was deleted before the request completed. "
+                    "The user may have logged out in a concurrent request, for example."
+                )
+            response.set_cookie(
+                cookie_name,
+                request.session.session_key,
+                max_age=max_age,
+                expires=expires,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                path=cookie_path,
+                secure=settings.SESSION_COOKIE_SECURE or None,
+                httponly=settings.SESSION_COOKIE_HTTPONLY or None,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations, models
+
+USER_EMAIL_INDEX = 'restaurant_user_email_idx'
+
+
+def _index():
+    return models.Index(fields=['email'], name=USER_EMAIL_INDEX)
+
+
+def _has_index(schema_editor, table):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        return USER_EMAIL_INDEX in connection.introspection.get_constraints(cursor, table)
+
+
+def add_user_email_index(apps, schema_editor):
+    """
+    Logins look users up by email as well as username, and auth_user ships
+    without an index on email. Databases set up before this migration may
+    already have it, from the post_migrate hook that used to create it.
+    """
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    if not _has_index(schema_editor, user_model._meta.db_table):
+        schema_editor.add_index(user_model, _index())
+
+
+def remove_user_email_index(apps, schema_editor):
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    if _has_index(schema_editor, user_model._meta.db_table):
+        schema_editor.remove_index(user_model, _index())
+
+
+class Migration(migrations.Migration):
+    # The index lives on another app's table, so it is created directly
+    # rather than through AddIndex, which only targets this app's models
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
+from .cart import clear_cached_cart_count, set_cached_cart_count
+from .events import publish_order_status
 
 class Reservation(models.Model):
     """
@@ -19,9 +23,24 @@ class Reservation(models.Model):
     special_requests = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # my_reservations lists a user's bookings by date and time
+            models.Index(fields=['user', 'date', 'time'], name='reservation_user_date_time'),
+        ]
+
     def __str__(self):
         return f"{self.name} | {self.date} at {self.time}"
 
+class DiningTable(models.Model):
+    """A table in the dining room; active tables' seats make up reservation capacity"""
+    name = models.CharField(max_length=50, unique=True)  # e.g. "T1", "Window 2"
+    seats = models.PositiveIntegerField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.seats} seats)"
+
 # Re-add the MenuItem model for dynamic menu items functionality.
 class MenuItem(models.Model):
     CATEGORY_CHOICES = [
@@ -33,7 +52,11 @@ class MenuItem(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=8, decimal_places=2)
-    image = models.URLField(blank=True, null=True)  # Use ImageField if file uploads are set up
+    image = models.URLField(blank=True, null=True)  # Remote image, used when no photo is uploaded
+    photo = models.ImageField(upload_to='menu/originals/', blank=True)  # Uploaded original
+    # Resized copies of photo by format and width, e.g. {"webp": {"480": "menu/derived/<hash>-480.webp"}};
+    # written by `manage.py build_menu_images`
+    image_variants = models.JSONField(default=dict, blank=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -65,10 +88,37 @@ class Order(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+
+    # Which statuses an order may move to from its current one
+    STATUS_TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled'),
+        'confirmed': ('preparing', 'cancelled'),
+        'preparing': ('ready', 'cancelled'),
+        'ready': ('completed',),
+    }
+
+    # Statuses in which an order counts as a sale in the reporting rollups
+    SALE_STATUSES = ('confirmed', 'preparing', 'ready', 'completed')
+
+    # Statuses the customer is emailed about; confirmation has its own message
+    NOTIFY_STATUSES = ('preparing', 'ready', 'completed', 'cancelled')
+
+    # Timestamp column stamped when an order enters a status
+    STATUS_TIMESTAMP_FIELDS = {
+        'confirmed': 'confirmed_at',
+        'preparing': 'preparing_at',
+        'ready': 'ready_at',
+        'completed': 'completed_at',
+    }
+
+    # Moved only by conditional UPDATEs (cart deltas, sales rollups); a full
+    # save from a stale instance must not write an old value back
+    UPDATE_ONLY_FIELDS = ('item_count', 'rolled_up')
     
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField(default=0, editable=False)  # Sum of line quantities, kept in step with total_amount
     special_instructions = models.TextField(blank=True)
     pickup_time = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -78,6 +128,24 @@ class Order(models.Model):
     ready_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_favorite = models.BooleanField(default=False)
+    rolled_up = models.BooleanField(default=False, editable=False)  # Counted in the sales rollups (restaurant.reporting)
+
+    class Meta:
+        indexes = [
+            # Cart lookups: Order(user, status='pending')
+            models.Index(fields=['user', 'status'], name='order_user_status'),
+            # Order history keyset pages on (created_at, id) per user
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created'),
+            # Admin and reporting sort by created_at across all users
+            models.Index(fields=['created_at'], name='order_created_at'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status='pending'),
+                name='one_pending_cart_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username if self.user else 'Guest'}"
@@ -108,7 +176,13 @@ class Order(models.Model):
         # Set completed_at when status changes to completed
         elif self.status == 'completed' and not self.completed_at:
             self.completed_at = timezone.localtime(timezone.now())
-        
+
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def update_status(self, new_status):
@@ -125,7 +199,168 @@ class Order(models.Model):
         elif new_status == 'completed' and not self.completed_at:
             self.completed_at = timezone.localtime(timezone.now())
         
-        self.save()
+        with transaction.atomic():
+            self.save()
+            if new_status in self.NOTIFY_STATUSES:
+                OutboxMessage.enqueue('order_status', order_id=self.id, status=new_status)
+        publish_order_status(self)
+
+    @classmethod
+    def allowed_sources(cls, new_status):
+        """Statuses from which an order may move to new_status"""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items() if new_status in targets]
+
+    @classmethod
+    def bulk_update_status(cls, order_ids, new_status):
+        """
+        Move many orders to new_status with a single UPDATE, skipping any
+        whose current status does not allow the transition.
+        Returns (updated orders, rejected ids).
+        """
+        sources = cls.allowed_sources(new_status)
+        if not sources:
+            raise ValueError(f"Unknown or unreachable status: {new_status}")
+        order_ids = set(order_ids)
+        now = timezone.now()
+        changes = {'status': new_status, 'updated_at': now}
+        timestamp_field = cls.STATUS_TIMESTAMP_FIELDS.get(new_status)
+        if timestamp_field:
+            # Keep the first time an order reached the status, as update_status does
+            changes[timestamp_field] = Coalesce(F(timestamp_field), Value(now))
+        with transaction.atomic():
+            # The source check sits on the UPDATE itself, so an order whose
+            # status changed since the caller read it is left alone; the rows
+            # it did change are the ones now carrying its timestamp
+            changed = cls.objects.filter(id__in=order_ids, status__in=sources).update(**changes)
+            updated = list(
+                cls.objects.filter(id__in=order_ids, status=new_status, updated_at=now).order_by('id')
+            ) if changed else []
+            movable = {order.id for order in updated}
+            user_ids = {order.user_id for order in updated if order.user_id}
+            # update() skips post_save, so drop badges of any carts that moved on
+            transaction.on_commit(lambda: [clear_cached_cart_count(user_id) for user_id in user_ids])
+            # update() skips post_save, so queue the rollup sync it would have
+            OutboxMessage.enqueue_many('order_rollups', [
+                {'order_id': order.id} for order in updated
+                if (new_status in cls.SALE_STATUSES) != order.rolled_up
+            ])
+            if new_status in cls.NOTIFY_STATUSES:
+                OutboxMessage.enqueue_many('order_status', [
+                    {'order_id': order.id, 'status': new_status} for order in updated
+                ])
+            for order in updated:
+                publish_order_status(order)
+        return updated, sorted(order_ids - movable)
+
+    def _apply_delta(self, amount, count):
+        """Shift the denormalized cart totals in the database and reload them"""
+        Order.objects.filter(pk=self.pk).update(
+            total_amount=F('total_amount') + amount,
+            item_count=F('item_count') + count,
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['total_amount', 'item_count', 'updated_at'])
+        if self.user_id and self.status == 'pending':
+            user_id, item_count = self.user_id, self.item_count
+            transaction.on_commit(lambda: set_cached_cart_count(user_id, item_count))
+
+    def add_item(self, menu_item, quantity, selected_options=None):
+        """Add quantity of menu_item to this order, merging into an existing line"""
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        selected_options = selected_options or {}
+        amount = menu_item.price * quantity
+        with transaction.atomic():
+            line = (OrderItem.objects.select_for_update()
+                    .filter(order=self, menu_item=menu_item).first())
+            if line is None:
+                try:
+                    with transaction.atomic():
+                        OrderItem.objects.create(
+                            order=self,
+                            menu_item=menu_item,
+                            quantity=quantity,
+                            selected_options=selected_options,
+                        )
+                except IntegrityError:
+                    # Another request created the line first; fall through and merge.
+                    # With no such line the error was not the unique constraint.
+                    line = (OrderItem.objects.select_for_update()
+                            .filter(order=self, menu_item=menu_item).first())
+                    if line is None:
+                        raise
+            if line is not None:
+                OrderItem.objects.filter(pk=line.pk).update(
+                    quantity=F('quantity') + quantity,
+                    item_total=F('item_total') + amount,
+                    selected_options={**line.selected_options, **selected_options},
+                )
+            self._apply_delta(amount, quantity)
+
+    def set_item_quantity(self, line, quantity):
+        """Set a line's quantity (removing it when quantity <= 0), repricing the line"""
+        with transaction.atomic():
+            line = (OrderItem.objects.select_for_update().select_related('menu_item')
+                    .get(pk=line.pk, order=self))
+            if quantity > 0:
+                price = line.menu_item.price if line.menu_item else line.item_total / line.quantity
+                new_total = price * quantity
+                OrderItem.objects.filter(pk=line.pk).update(quantity=quantity, item_total=new_total)
+            else:
+                quantity = 0
+                new_total = Decimal('0.00')
+                line.delete()
+            self._apply_delta(new_total - line.item_total, quantity - line.quantity)
+
+    def merge_lines(self, lines):
+        """
+        Add copies of lines (OrderItems from other orders, with menu_item
+        loaded) to this order at current menu prices. Lines for the same
+        menu item are merged, both with each other and with this order's
+        existing lines. Returns the number of items added.
+        """
+        merged = {}
+        for line in lines:
+            if line.menu_item is None:
+                continue
+            quantity, options = merged.get(line.menu_item_id, (0, {}))
+            merged[line.menu_item_id] = (quantity + line.quantity, {**options, **line.selected_options})
+        if not merged:
+            return 0
+        prices = {line.menu_item_id: line.menu_item.price for line in lines if line.menu_item}
+
+        with transaction.atomic():
+            existing = {
+                line.menu_item_id: line
+                for line in OrderItem.objects.select_for_update()
+                .filter(order=self, menu_item_id__in=merged)
+            }
+            to_create, to_update = [], []
+            amount = Decimal('0.00')
+            count = 0
+            for menu_item_id, (quantity, options) in merged.items():
+                line_amount = prices[menu_item_id] * quantity
+                amount += line_amount
+                count += quantity
+                line = existing.get(menu_item_id)
+                if line is None:
+                    to_create.append(OrderItem(
+                        order=self,
+                        menu_item_id=menu_item_id,
+                        quantity=quantity,
+                        selected_options=options,
+                        item_total=line_amount,
+                    ))
+                else:
+                    line.quantity += quantity
+                    line.item_total += line_amount
+                    line.selected_options = {**line.selected_options, **options}
+                    to_update.append(line)
+            # bulk_create skips OrderItem.save(), so item_total is set above
+            OrderItem.objects.bulk_create(to_create)
+            OrderItem.objects.bulk_update(to_update, ['quantity', 'item_total', 'selected_options'])
+            self._apply_delta(amount, count)
+        return count
 
 class OrderItem(models.Model):
     """Individual items within an order"""
@@ -135,6 +370,12 @@ class OrderItem(models.Model):
     selected_options = models.JSONField(default=dict)
     item_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        constraints = [
+            # One line per menu item in an order; add_item merges quantities instead
+            models.UniqueConstraint(fields=['order', 'menu_item'], name='unique_order_menu_item'),
+        ]
+
     def __str__(self):
         # Handle case where menu_item is None
         item_name = self.menu_item.name if self.menu_item else "Deleted Item"
@@ -145,3 +386,82 @@ class OrderItem(models.Model):
         if self.menu_item:
             self.item_total = self.menu_item.price * self.quantity
         super().save(*args, **kwargs)
+
+class OutboxMessage(models.Model):
+    """
+    A side effect (email, notification) recorded in the same transaction
+    as the change that caused it and carried out later by the
+    `run_outbox` worker, so slow or failing deliveries never hold up a
+    request or get lost when one rolls back.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)  # Key into restaurant.notifications.HANDLERS
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Not picked up before this time
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls for due pending messages in id order
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, kind, **payload):
+        """Record a message; call inside the transaction whose outcome it reports"""
+        return cls.objects.create(kind=kind, payload=payload)
+
+    @classmethod
+    def enqueue_many(cls, kind, payloads):
+        return cls.objects.bulk_create([cls(kind=kind, payload=payload) for payload in payloads])
+
+class StripeEvent(models.Model):
+    """A Stripe webhook event we have accepted; retries of it are acknowledged and dropped"""
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
+
+class HourlySales(models.Model):
+    """Sales rollup for one local hour, kept in step with orders by restaurant.reporting"""
+    hour = models.DateTimeField(unique=True)  # Start of the hour, local time
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Before tax
+    orders = models.IntegerField(default=0)
+    covers = models.IntegerField(default=0)  # Items served (sum of order item quantities)
+
+    class Meta:
+        verbose_name_plural = 'hourly sales'
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00}: {self.orders} orders"
+
+class DailyItemSales(models.Model):
+    """Quantity and revenue of one menu item on one local day"""
+    day = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True)
+    item_name = models.CharField(max_length=100)  # Kept for reports after the item is deleted
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily item sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'menu_item'], name='unique_day_menu_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.item_name} x{self.quantity}"
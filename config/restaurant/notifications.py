@@ -0,0 +1,57 @@
+"""
+Outbox message handlers.
+
+Each handler takes a message payload and performs the side effect,
+raising to have the worker retry later. Handlers may run more than once
+for a message (a worker can die after sending but before recording it),
+so keep them safe to repeat.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+
+from .images import build_menu_item_images
+from .models import Order
+from .reporting import sync_order_rollups_message
+from .webhooks import handle_stripe_event
+
+
+def _send_order_email(order, subject, template, **context):
+    if order.user is None or not order.user.email:
+        return
+    body = render_to_string(template, {'order': order, 'restaurant_name': settings.RESTAURANT_NAME, **context})
+    send_mail(subject, body, settings.RESTAURANT_EMAIL, [order.user.email])
+
+
+def send_order_confirmation(payload):
+    order = (Order.objects.select_related('user')
+             .prefetch_related('items__menu_item')
+             .filter(id=payload['order_id']).first())
+    if order is None:
+        return
+    _send_order_email(
+        order,
+        f"{settings.RESTAURANT_NAME}: order #{order.id} confirmed",
+        'restaurant/emails/order_confirmation.txt',
+    )
+
+
+def send_order_status_update(payload):
+    order = Order.objects.select_related('user').filter(id=payload['order_id']).first()
+    if order is None or order.status != payload['status']:
+        # Deleted, or already moved on; a later message covers the new status
+        return
+    _send_order_email(
+        order,
+        f"{settings.RESTAURANT_NAME}: order #{order.id} is {order.get_status_display().lower()}",
+        'restaurant/emails/order_status.txt',
+    )
+
+
+HANDLERS = {
+    'order_confirmation': send_order_confirmation,
+    'order_status': send_order_status_update,
+    'stripe_event': handle_stripe_event,
+    'menu_item_images': build_menu_item_images,
+    'order_rollups': sync_order_rollups_message,
+}
@@ -0,0 +1,94 @@
+"""
+Draining the transactional outbox.
+
+Workers claim due messages by pushing their available_at forward by a
+lease (a conditional UPDATE, so two workers never claim the same row),
+run the handlers on a thread pool, and record each outcome. A failed
+message is retried with exponential backoff until OUTBOX_MAX_ATTEMPTS,
+then marked failed. A worker that dies mid-batch simply lets the lease
+expire and the messages come due again.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .notifications import HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Seconds before the next try: exponential in attempts, capped, with jitter"""
+    base = settings.OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    delay = min(base, settings.OUTBOX_RETRY_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_due(batch_size):
+    """Lease up to batch_size due messages to this worker and return them"""
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    candidates = list(
+        OutboxMessage.objects.filter(status='pending', available_at__lte=now)
+        .order_by('id')[:batch_size]
+    )
+    claimed = []
+    for message in candidates:
+        taken = OutboxMessage.objects.filter(
+            id=message.id, status='pending', available_at=message.available_at,
+        ).update(available_at=lease_until)
+        if taken:
+            claimed.append(message)
+    return claimed
+
+
+def _run_handler(message):
+    """Run one message's handler on a pool thread; returns an error string or None"""
+    try:
+        handler = HANDLERS.get(message.kind)
+        if handler is None:
+            return f"No handler for {message.kind!r}"
+        handler(message.payload)
+        return None
+    except Exception as exc:
+        logger.exception("Outbox message %s (%s) failed", message.id, message.kind)
+        return f"{type(exc).__name__}: {exc}"
+    finally:
+        # Pool threads each hold their own connection
+        connection.close()
+
+
+def _record(message, error):
+    attempts = message.attempts + 1
+    if error is None:
+        changes = {'status': 'sent', 'sent_at': timezone.now(), 'last_error': ''}
+    elif attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        changes = {'status': 'failed', 'last_error': error}
+    else:
+        changes = {
+            'available_at': timezone.now() + timedelta(seconds=retry_delay(attempts)),
+            'last_error': error,
+        }
+    OutboxMessage.objects.filter(id=message.id).update(attempts=attempts, **changes)
+    return changes.get('status', 'retry')
+
+
+def process_batch(executor, batch_size):
+    """Claim and deliver one batch; returns {'sent'|'retry'|'failed': count}"""
+    close_old_connections()
+    messages = claim_due(batch_size)
+    outcomes = {}
+    for message, error in zip(messages, executor.map(_run_handler, messages)):
+        outcome = _record(message, error)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return outcomes
+
+
+def make_executor(threads):
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix='outbox')
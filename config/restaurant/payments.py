@@ -0,0 +1,169 @@
+"""
+Payment provider client.
+
+All Stripe calls go through one StripeClient per process. It has a
+pooled keep-alive HTTP session and short connect and read timeouts.
+Transient failures (network errors, 429 and 5xx) are retried with full
+jitter, under an idempotency key so a retried create never double
+charges. A circuit breaker fails fast with PaymentUnavailable while the
+provider is down, so checkouts do not each wait out the timeouts.
+Point STRIPE_API_BASE at `manage.py fake_payment_server` to exercise all
+of this offline.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentUnavailable(Exception):
+    """The provider could not be reached, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `threshold` consecutive failures it
+    opens and rejects calls for `reset_seconds`, then lets a single trial
+    call through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logger.warning("Payment provider circuit opened after %d failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def _is_transient(error):
+    if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError)):
+        return True
+    return isinstance(error, stripe.StripeError) and (error.http_status or 0) >= 500
+
+
+class PaymentClient:
+    def __init__(self, api_key, api_base=None, connect_timeout=2.0, read_timeout=8.0,
+                 max_retries=2, backoff_seconds=0.2, pool_size=10,
+                 breaker_threshold=5, breaker_reset_seconds=30):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.stripe = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else None,
+            http_client=stripe.RequestsClient(session=session, timeout=(connect_timeout, read_timeout)),
+            max_network_retries=0,  # Retries happen here, where the breaker sees them
+        )
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+
+    def call(self, method, *args, **kwargs):
+        """Run a StripeClient method with retries, behind the circuit breaker"""
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise PaymentUnavailable("Payment provider circuit is open")
+            try:
+                result = method(*args, **kwargs)
+            except stripe.StripeError as e:
+                if not _is_transient(e):
+                    # The provider answered; a declined card is not an outage
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise PaymentUnavailable(str(e)) from e
+                # Full jitter: anywhere up to the exponential backoff
+                time.sleep(random.uniform(0, self.backoff_seconds * 2 ** attempt))
+            except Exception:
+                # Anything else still ends the call (and a half-open trial)
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def create_payment_intent(self, order):
+        amount = int(order.get_total_with_tax() * 100)
+        return self.call(
+            self.stripe.payment_intents.create,
+            params={
+                'amount': amount,
+                'currency': 'inr',
+                'metadata': {'order_id': order.id, 'user_id': order.user_id},
+            },
+            # Same order and amount, same intent: retries cannot double charge
+            options={'idempotency_key': f"order-{order.id}-{amount}"},
+        )
+
+    async def acreate_payment_intent(self, order):
+        """
+        create_payment_intent for async views, run in a worker thread so
+        the event loop is not blocked; retries and the breaker are shared.
+        """
+        return await sync_to_async(self.create_payment_intent, thread_sensitive=False)(order)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_payment_client():
+    """The process-wide client, built from settings on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaymentClient(
+                    settings.STRIPE_SECRET_KEY,
+                    api_base=settings.STRIPE_API_BASE,
+                    **{key.lower(): value for key, value in settings.PAYMENT_CLIENT.items()},
+                )
+    return _client
@@ -0,0 +1,168 @@
+"""
+Sales reporting.
+
+HourlySales and DailyItemSales are rollups that grow with time, not with
+order volume. An order is added to them when it first reaches one of
+Order.SALE_STATUSES, and taken out again if it is cancelled afterwards.
+Status changes queue an outbox message, so the request that makes them
+does not wait on the rollup writes. Order.rolled_up is flipped with a
+conditional UPDATE, so repeated or concurrent messages cannot count an
+order twice, and the handlers read the order's state from the database
+rather than trusting the instance that was saved. Deleting a counted
+order takes it out of the rollups before its lines go. Sales are
+bucketed by confirmation time in the local timezone. The dashboard
+reads only these tables; `manage.py backfill_sales_rollups` rebuilds
+them from the orders.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import DailyItemSales, HourlySales, Order, OrderItem
+
+
+def sale_time(order):
+    return order.confirmed_at or order.created_at or timezone.now()
+
+
+def hour_bucket(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _increment(model, lookup, defaults, **deltas):
+    """Add deltas to the row matching lookup, creating it if needed"""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults, **deltas)
+    except IntegrityError:
+        # Created concurrently; add to it instead
+        model.objects.filter(**lookup).update(**changes)
+
+
+def _apply(order, sign):
+    moment = sale_time(order)
+    lines = list(order.items.select_related('menu_item'))
+    _increment(
+        HourlySales, {'hour': hour_bucket(moment)}, {},
+        revenue=sign * order.total_amount,
+        orders=sign,
+        # From the lines, not the cached Order.item_count
+        covers=sign * sum(line.quantity for line in lines),
+    )
+    day = timezone.localdate(moment)
+    for line in lines:
+        if line.menu_item is None:
+            continue
+        _increment(
+            DailyItemSales, {'day': day, 'menu_item_id': line.menu_item_id}, {'item_name': line.menu_item.name},
+            quantity=sign * line.quantity,
+            revenue=sign * line.item_total,
+        )
+
+
+def sync_order_rollups(order_id):
+    """Add or remove an order's contribution so it matches its stored status"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id).first()
+        if order is None:
+            return
+        counts = order.status in Order.SALE_STATUSES
+        # Whoever flips the flag applies the change, exactly once. Matching
+        # the status just read keeps a concurrent change from slipping in;
+        # that change queues its own message.
+        flipped = (Order.objects.filter(pk=order.pk, status=order.status, rolled_up=not counts)
+                   .update(rolled_up=counts))
+        if flipped:
+            order.rolled_up = counts
+            _apply(order, 1 if counts else -1)
+
+
+def sync_order_rollups_message(payload):
+    """Outbox handler queued by the Order post_save receiver and bulk status changes"""
+    sync_order_rollups(payload['order_id'])
+
+
+def remove_order_rollups(order_id):
+    """Take a counted order out of the rollups; call before deleting it"""
+    with transaction.atomic():
+        if Order.objects.filter(pk=order_id, rolled_up=True).update(rolled_up=False):
+            _apply(Order.objects.get(pk=order_id), -1)
+
+
+def _sale_orders(since=None):
+    orders = Order.objects.filter(status__in=Order.SALE_STATUSES).annotate(
+        sold_at=Coalesce('confirmed_at', 'created_at'))
+    if since is not None:
+        orders = orders.filter(sold_at__gte=since)
+    return orders
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute the rollups from the orders, for everything or for sales
+    from `since` (a local midnight) onwards. Returns (hours, item rows).
+    """
+    with transaction.atomic():
+        hourly = HourlySales.objects.all()
+        daily = DailyItemSales.objects.all()
+        flags = Order.objects.all()
+        if since is not None:
+            hourly = hourly.filter(hour__gte=since)
+            daily = daily.filter(day__gte=timezone.localdate(since))
+            flags = flags.annotate(sold_at=Coalesce('confirmed_at', 'created_at')).filter(sold_at__gte=since)
+        hourly.delete()
+        daily.delete()
+
+        orders = _sale_orders(since)
+        covers = (OrderItem.objects.filter(order=OuterRef('pk'))
+                  .values('order').annotate(total=Sum('quantity')).values('total'))
+        hours = [
+            HourlySales(hour=row['hour'], revenue=row['revenue'], orders=row['orders'], covers=row['covers'])
+            for row in orders.annotate(hour=TruncHour('sold_at'), line_quantity=Coalesce(Subquery(covers), 0))
+            .values('hour').annotate(revenue=Sum('total_amount'), orders=Count('id'), covers=Sum('line_quantity'))
+        ]
+        lines = (OrderItem.objects.filter(order__in=orders.values('id'), menu_item__isnull=False)
+                 .annotate(day=TruncDate(Coalesce('order__confirmed_at', 'order__created_at')))
+                 .values('day', 'menu_item_id')
+                 .annotate(item_name=Max('menu_item__name'), quantity=Sum('quantity'), revenue=Sum('item_total')))
+        items = [DailyItemSales(**row) for row in lines]
+        HourlySales.objects.bulk_create(hours, batch_size=500)
+        DailyItemSales.objects.bulk_create(items, batch_size=500)
+
+        flags.update(rolled_up=False)
+        Order.objects.filter(id__in=orders.values('id')).update(rolled_up=True)
+    return len(hours), len(items)
+
+
+def sales_report(start, end):
+    """
+    Totals, a per-day series, an hour-of-day profile and the top items
+    for local dates start..end inclusive, read from the rollups only.
+    """
+    tz = timezone.get_current_timezone()
+    hours = HourlySales.objects.filter(
+        hour__gte=datetime.combine(start, time.min, tz),
+        hour__lt=datetime.combine(end + timedelta(days=1), time.min, tz),
+    )
+    totals = hours.aggregate(
+        revenue=Coalesce(Sum('revenue'), Value(Decimal('0.00'))),
+        orders=Coalesce(Sum('orders'), Value(0)),
+        covers=Coalesce(Sum('covers'), Value(0)),
+    )
+    totals['average_order'] = totals['revenue'] / totals['orders'] if totals['orders'] else Decimal('0.00')
+    days = list(hours.annotate(day=TruncDate('hour')).values('day').annotate(
+        revenue=Sum('revenue'), orders=Sum('orders'), covers=Sum('covers')).order_by('day'))
+    by_hour = list(hours.annotate(hour_of_day=ExtractHour('hour')).values('hour_of_day').annotate(
+        revenue=Sum('revenue'), orders=Sum('orders')).order_by('hour_of_day'))
+    top_items = list(DailyItemSales.objects.filter(day__range=(start, end))
+                     .values('menu_item_id').annotate(
+                         name=Max('item_name'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+                     .filter(quantity__gt=0).order_by('-revenue')[:10])
+    return {'totals': totals, 'days': days, 'by_hour': by_hour, 'top_items': top_items}
@@ -0,0 +1,98 @@
+"""
+Menu search.
+
+An inverted index over the menu snapshot's items, built on first use and
+thrown away with the snapshot when the menu version moves, so it is never
+stale and needs no extra table. Queries are conjunctive. The last query
+word also matches as a prefix, for search-as-you-type. Results are
+ranked with BM25, where a match in the name weighs more than one in the
+description. A query touches only the postings of its own terms, so it
+stays well under a millisecond even with thousands of items.
+"""
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+TOKEN = re.compile(r'\w+')
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+K1 = 1.2
+B = 0.75
+PREFIX_EXPANSIONS = 50  # Most vocabulary terms one prefix may stand for
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return TOKEN.findall(text.lower())
+
+
+class MenuSearchIndex:
+    def __init__(self, items):
+        self.items = items
+        self.postings = {}  # term -> {item index: weighted term frequency}
+        self.lengths = []
+        for index, item in enumerate(items):
+            weighted = {}
+            name_terms = tokenize(item.name)
+            description_terms = tokenize(item.description)
+            for term in name_terms:
+                weighted[term] = weighted.get(term, 0.0) + NAME_WEIGHT
+            for term in description_terms:
+                weighted[term] = weighted.get(term, 0.0) + DESCRIPTION_WEIGHT
+            for term, frequency in weighted.items():
+                self.postings.setdefault(term, {})[index] = frequency
+            self.lengths.append(NAME_WEIGHT * len(name_terms) + DESCRIPTION_WEIGHT * len(description_terms))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.vocabulary = sorted(self.postings)
+
+    def _idf(self, term):
+        matches = len(self.postings[term])
+        return math.log(1 + (len(self.items) - matches + 0.5) / (matches + 0.5))
+
+    def _expand(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:start + PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _term_scores(self, terms):
+        """{item index: best BM25 score among terms} for items matching any of terms"""
+        scores = {}
+        for term in terms:
+            idf = self._idf(term)
+            for index, frequency in self.postings[term].items():
+                norm = K1 * (1 - B + B * self.lengths[index] / self.average_length)
+                score = idf * frequency * (K1 + 1) / (frequency + norm)
+                if score > scores.get(index, 0.0):
+                    scores[index] = score
+        return scores
+
+    def search(self, query, categories=None, limit=20):
+        """Return [(item, score)] best first; every query word must match"""
+        words = tokenize(query)
+        if not words:
+            return []
+        totals = None
+        for position, word in enumerate(words):
+            if position == len(words) - 1:
+                terms = self._expand(word)
+            else:
+                terms = [word] if word in self.postings else []
+            scores = self._term_scores(terms)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {index: totals[index] + score for index, score in scores.items() if index in totals}
+            if not totals:
+                return []
+        results = [
+            (self.items[index], score) for index, score in totals.items()
+            if not categories or self.items[index].category in categories
+        ]
+        results.sort(key=lambda pair: (-pair[1], pair[0].id))
+        return results[:limit]
@@ -0,0 +1,65 @@
+"""
+Signed-cookie sessions for anonymous visitors, write-behind sessions
+(see write_behind) once a user logs in.
+
+Anonymous browsing never touches the cache or database for its session.
+On login the session moves server-side under a fresh random key, so
+authenticated sessions can still be revoked.
+"""
+from django.contrib.auth import SESSION_KEY
+from django.core import signing
+
+from . import write_behind
+
+SALT = 'restaurant.session_backends.hybrid'
+
+
+def is_signed(session_key):
+    # Server-side keys are [a-z0-9]; signed payloads always contain ':'
+    return bool(session_key) and ':' in session_key
+
+
+class SessionStore(write_behind.SessionStore):
+
+    def load(self):
+        if not is_signed(self.session_key):
+            return super().load()
+        try:
+            return signing.loads(
+                self.session_key,
+                serializer=self.serializer,
+                max_age=self.get_session_cookie_age(),
+                salt=SALT,
+            )
+        except signing.BadSignature:
+            self._session_key = None
+            return {}
+
+    def exists(self, session_key):
+        return not is_signed(session_key) and super().exists(session_key)
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        if SESSION_KEY in data:
+            if self.session_key is None or is_signed(self.session_key):
+                # First save after login: move the session server-side
+                self._session_key = None
+                return self.create()
+            return super().save(must_create)
+        self._session_key = signing.dumps(
+            data, compress=True, salt=SALT, serializer=self.serializer,
+        )
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if is_signed(session_key):
+            # Nothing is stored server-side; dropping the cookie is enough
+            return
+        super().delete(session_key)
+
+    def cycle_key(self):
+        if SESSION_KEY in self._get_session() or not is_signed(self.session_key):
+            return super().cycle_key()
+        # An anonymous signed session gets a new value on its next save anyway
+        self.modified = True
@@ -0,0 +1,145 @@
+"""
+Cache-first sessions with write-behind to the database.
+
+Reads come from the cache and fall back to the database. Writes go to
+the cache at once and are queued; a background thread upserts the queue
+into django_session in one statement every SESSION_WRITE_BEHIND_SECONDS,
+so busy request paths stop competing for the database write lock. Use a
+cache shared by all workers in production.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'restaurant.sessions.write_behind'
+
+
+class WriteBehindQueue:
+    """Pending session rows, flushed to the database by a daemon thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time (thread, atexit, tests)
+        self._pending = {}
+        # Keys of the batch being flushed, and those of them deleted meanwhile
+        self._flushing = set()
+        self._tombstones = set()
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='session-write-behind', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def put(self, session):
+        with self._lock:
+            self._pending[session.session_key] = session
+            self._tombstones.discard(session.session_key)
+            self._start()
+
+    def get(self, session_key):
+        with self._lock:
+            return self._pending.get(session_key)
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+            if session_key in self._flushing:
+                # The in-flight upsert may write the row back; delete it again after
+                self._tombstones.add(session_key)
+
+    def flush(self):
+        """Upsert every pending session row in a single statement"""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flushing = set(batch)
+        if not batch:
+            return 0
+        model = next(iter(batch.values())).__class__
+        try:
+            model.objects.bulk_create(
+                batch.values(),
+                update_conflicts=True,
+                unique_fields=['session_key'],
+                update_fields=['session_data', 'expire_date'],
+            )
+        except Exception:
+            logger.exception("Session write-behind flush failed; retrying %d rows", len(batch))
+            with self._lock:
+                retry = {key: session for key, session in batch.items() if key not in self._tombstones}
+                # Keep anything written since the swap; it is newer than the batch
+                self._pending = {**retry, **self._pending}
+                self._flushing, self._tombstones = set(), set()
+            return 0
+        else:
+            with self._lock:
+                deleted, self._tombstones = self._tombstones, set()
+                self._flushing = set()
+            if deleted:
+                model.objects.filter(session_key__in=deleted).delete()
+        finally:
+            close_old_connections()
+        return len(batch)
+
+    def _run(self):
+        interval = getattr(settings, 'SESSION_WRITE_BEHIND_SECONDS', 5)
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+queue = WriteBehindQueue()
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends (e.g. memcache) raise on invalid keys; treat as a miss
+            data = None
+        if data is not None:
+            return data
+        session = queue.get(self.session_key) or self._get_session_from_db()
+        if session is None:
+            return {}
+        data = self.decode(session.session_data)
+        self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=session.expire_date))
+        return data
+
+    def exists(self, session_key):
+        return bool(session_key) and queue.get(session_key) is not None or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if must_create:
+            if not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+        queue.put(self.create_model_instance(data))
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            queue.discard(session_key)
+        super().delete(session_key)
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .availability import bump_reservation_version
+from .cart import clear_cached_cart_count
+from .catalog import bump_menu_version
+from .metrics import record_query
+from .reporting import remove_order_rollups
+from .models import DiningTable, MenuItem, MenuItemOption, Order, OutboxMessage, Reservation
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=MenuItemOption)
+def invalidate_menu_snapshot(sender, **kwargs):
+    """Bump the menu version once the change is committed"""
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_cart_count(sender, instance, **kwargs):
+    """Drop the cached badge whenever a cart is created, checked out or removed"""
+    if instance.user_id:
+        transaction.on_commit(lambda: clear_cached_cart_count(instance.user_id))
+
+
+@receiver(post_save, sender=Order)
+def queue_sales_rollup(sender, instance, created, update_fields, **kwargs):
+    """
+    Orders entering or leaving a sale status update the reporting rollups.
+    A saved instance may be stale, so any status write is queued and the
+    handler compares the stored status with the stored flag.
+    """
+    if created:
+        if instance.status in Order.SALE_STATUSES:
+            OutboxMessage.enqueue('order_rollups', order_id=instance.id)
+    elif update_fields is None or 'status' in update_fields:
+        OutboxMessage.enqueue('order_rollups', order_id=instance.id)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_sales_rollup(sender, instance, **kwargs):
+    """A counted order leaves the rollups while its lines still exist"""
+    remove_order_rollups(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+@receiver([post_save, post_delete], sender=DiningTable)
+def invalidate_availability(sender, **kwargs):
+    """Any booking or table change makes the cached availability stale"""
+    transaction.on_commit(bump_reservation_version)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Time every query made on behalf of a request"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
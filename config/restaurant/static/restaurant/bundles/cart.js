@@ -0,0 +1,103 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Quantity controls
+    document.querySelectorAll('.qty-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            const input = this.parentElement.querySelector('input');
+            const currentValue = parseInt(input.value);
+            const itemId = this.closest('.cart-item').dataset.itemId;
+
+            if (this.classList.contains('minus')) {
+                if (currentValue > 1) {
+                    updateQuantity(itemId, currentValue - 1);
+                }
+            } else {
+                if (currentValue < 10) {
+                    updateQuantity(itemId, currentValue + 1);
+                }
+            }
+        });
+    });
+
+    // Remove buttons
+    document.querySelectorAll('.remove-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            const itemId = this.closest('.cart-item').dataset.itemId;
+            updateQuantity(itemId, 0);
+        });
+    });
+
+    async function updateQuantity(itemId, quantity) {
+        try {
+            const response = await fetch('/update-cart/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken')
+                },
+                body: JSON.stringify({
+                    item_id: itemId,
+                    quantity: quantity
+                })
+            });
+
+            const data = await response.json();
+
+            if (data.status === 'success') {
+                location.reload();
+            } else {
+                showMessage('Error updating cart', 'error');
+            }
+        } catch (error) {
+            showMessage('Error updating cart', 'error');
+        }
+    }
+
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    function showMessage(message, type) {
+        const existingMessage = document.querySelector('.alert-message');
+        if (existingMessage) {
+            existingMessage.remove();
+        }
+
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `alert-message ${type}`;
+        messageDiv.textContent = message;
+
+        document.body.appendChild(messageDiv);
+
+        setTimeout(() => {
+            messageDiv.remove();
+        }, 3000);
+    }
+
+    function validateCheckout() {
+        const pickupTime = document.getElementById('pickup_time').value;
+        const errorDiv = document.getElementById('pickup-time-error');
+
+        if (!pickupTime) {
+            errorDiv.textContent = 'Please select a pickup time';
+            return false;
+        }
+
+        return true;
+    }
+
+    // Clear error message when user selects a time
+    document.getElementById('pickup_time').addEventListener('change', function() {
+        document.getElementById('pickup-time-error').textContent = '';
+    });
+});
@@ -0,0 +1,191 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Function to get CSRF token from cookies
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    // Handle quantity buttons
+    document.querySelectorAll('.qty-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            const input = this.parentElement.querySelector('input');
+            const currentValue = parseInt(input.value);
+
+            if (this.classList.contains('minus')) {
+                if (currentValue > 1) input.value = currentValue - 1;
+            } else {
+                if (currentValue < 10) input.value = currentValue + 1;
+            }
+        });
+    });
+
+    // Handle add to cart forms
+    document.querySelectorAll('.add-to-cart-form').forEach(form => {
+        form.addEventListener('submit', async function(e) {
+            e.preventDefault();
+
+            const itemId = this.dataset.itemId;
+            const quantity = parseInt(this.querySelector('input[name="quantity"]').value);
+            const options = {};
+
+            // Collect selected options
+            this.querySelectorAll('select').forEach(select => {
+                if (select.value) {
+                    const optionName = select.name.replace('option_', '');
+                    options[optionName] = select.value;
+                }
+            });
+
+            try {
+                const response = await fetch('/add-to-cart/', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': getCookie('csrftoken')
+                    },
+                    body: JSON.stringify({
+                        menu_item_id: itemId,
+                        quantity: quantity,
+                        options: options
+                    })
+                });
+
+                const data = await response.json();
+
+                if (!response.ok) {
+                    if (response.status === 401) {
+                        showLoginSuggestion();
+                    } else {
+                        showMessage(data.message || 'Error adding item to cart', 'error');
+                    }
+                    return;
+                }
+
+                if (data.status === 'success') {
+                    showMessage('Item added to cart', 'success');
+                    updateCart();
+                } else {
+                    showMessage(data.message || 'Error adding item to cart', 'error');
+                }
+            } catch (error) {
+                console.error('Error:', error);
+                showMessage('Error adding item to cart', 'error');
+            }
+        });
+    });
+
+    // Function to update cart preview
+    async function updateCart() {
+        try {
+            const response = await fetch('/cart-preview/');
+            const data = await response.json();
+
+            const cartPreview = document.querySelector('.cart-preview');
+            const cartItems = document.querySelector('.cart-items');
+            const cartTotal = document.querySelector('.total-amount');
+
+            if (data.items && data.items.length > 0) {
+                // Update cart items
+                cartItems.innerHTML = data.items.map(item => `
+                    <div class="cart-item">
+                        <div class="item-info">
+                            <span class="item-name">${item.name}</span>
+                            <span class="item-quantity">×${item.quantity}</span>
+                        </div>
+                        <span class="item-price">₹${item.total}</span>
+                    </div>
+                `).join('');
+
+                // Update total
+                if (cartTotal) {
+                    cartTotal.textContent = `₹${data.total}`;
+                }
+
+                // Show cart preview
+                cartPreview.classList.add('has-items');
+            } else {
+                cartPreview.classList.remove('has-items');
+            }
+        } catch (error) {
+            console.error('Error updating cart:', error);
+        }
+    }
+
+    // Function to show messages
+    function showMessage(message, type) {
+        const existingMessage = document.querySelector('.alert-message');
+        if (existingMessage) {
+            existingMessage.remove();
+        }
+
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `alert-message ${type}`;
+        messageDiv.textContent = message;
+
+        document.body.appendChild(messageDiv);
+
+        // Remove message after 3 seconds
+        setTimeout(() => {
+            messageDiv.remove();
+        }, 3000);
+    }
+
+    // Add this to your existing JavaScript
+    document.querySelector('.close-preview').addEventListener('click', function() {
+        document.querySelector('.cart-preview').classList.remove('has-items');
+    });
+
+    // Add this function to show login suggestion
+    function showLoginSuggestion() {
+        // Remove any existing login modals
+        const existingModal = document.querySelector('.login-suggestion-modal');
+        if (existingModal) {
+            existingModal.remove();
+        }
+
+        const modal = document.createElement('div');
+        modal.className = 'login-suggestion-modal';
+        modal.innerHTML = `
+            <div class="modal-content">
+                <h3>Login Required</h3>
+                <p>Please login to add items to your cart</p>
+                <div class="modal-buttons">
+                    <a href="/login" class="btn btn-primary">Login</a>
+                    <button class="btn btn-secondary close-modal">Cancel</button>
+                </div>
+            </div>
+        `;
+
+        document.body.appendChild(modal);
+
+        // Add close functionality
+        const closeBtn = modal.querySelector('.close-modal');
+        if (closeBtn) {
+            closeBtn.addEventListener('click', () => {
+                modal.remove();
+            });
+        }
+
+        // Close on click outside
+        modal.addEventListener('click', (e) => {
+            if (e.target === modal) {
+                modal.remove();
+            }
+        });
+
+        // Prevent modal content clicks from closing the modal
+        modal.querySelector('.modal-content').addEventListener('click', (e) => {
+            e.stopPropagation();
+        });
+    }
+});
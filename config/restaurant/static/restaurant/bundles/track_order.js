@@ -0,0 +1,80 @@
+function applyOrderStatus(data) {
+    const timeline = document.querySelector('.order-timeline');
+    const items = timeline.querySelectorAll('.timeline-item');
+
+    // Update timeline items based on status
+    items.forEach(item => {
+        const statusText = item.querySelector('h3').textContent.toLowerCase();
+
+        if (data.status === 'completed' || 
+            (data.status === 'ready' && statusText !== 'completed') ||
+            (data.status === 'preparing' && (statusText === 'order confirmed' || statusText === 'preparing')) ||
+            (data.status === 'confirmed' && statusText === 'order confirmed')) {
+            item.classList.add('completed');
+            item.querySelector('.status-icon').textContent = '✓';
+        }
+
+        // Update timestamps
+        if (data[`${statusText.replace(' ', '_')}_at`]) {
+            const time = new Date(data[`${statusText.replace(' ', '_')}_at`]);
+            item.querySelector('p').textContent = time.toLocaleTimeString([], { hour: 'numeric', minute: '2-digit' });
+        }
+    });
+}
+
+function isFinalStatus(status) {
+    return status === 'completed' || status === 'cancelled';
+}
+
+function pollOrderStatus(orderId) {
+    fetch(`/api/order-status/${orderId}/`)
+        .then(response => response.json())
+        .then(data => {
+            applyOrderStatus(data);
+
+            // If order is not completed, schedule next update
+            if (!isFinalStatus(data.status)) {
+                setTimeout(() => pollOrderStatus(orderId), 30000); // Update every 30 seconds
+            }
+        })
+        .catch(error => console.error('Error updating order status:', error));
+}
+
+const FIRST_EVENT_TIMEOUT = 10000; // ms to wait for the stream before polling
+
+function watchOrderStatus() {
+    const orderId = document.querySelector('.order-timeline').dataset.orderId;
+
+    // Fall back to polling where server-sent events are unavailable
+    if (!window.EventSource) {
+        pollOrderStatus(orderId);
+        return;
+    }
+
+    const source = new EventSource(`/api/order-status/${orderId}/stream/`);
+    let fellBack = false;
+    const fallBack = () => {
+        source.close();
+        if (!fellBack) {
+            fellBack = true;
+            pollOrderStatus(orderId);
+        }
+    };
+    // No stream (e.g. a WSGI server answers with plain JSON) or no first event in time
+    const firstEventTimer = setTimeout(fallBack, FIRST_EVENT_TIMEOUT);
+    source.addEventListener('status', event => {
+        clearTimeout(firstEventTimer);
+        const data = JSON.parse(event.data);
+        applyOrderStatus(data);
+        if (isFinalStatus(data.status)) {
+            source.close();
+        }
+    });
+    source.onerror = () => {
+        clearTimeout(firstEventTimer);
+        fallBack();
+    };
+}
+
+// Start updating order status
+watchOrderStatus();
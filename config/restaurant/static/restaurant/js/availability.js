@@ -0,0 +1,46 @@
+// Grey out reservation times that no longer have room for the party
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.querySelector('.reservation-form');
+    if (!form) return;
+
+    const dateInput = form.querySelector('#date');
+    const guestsSelect = form.querySelector('#guests');
+    const timeSelect = form.querySelector('#time');
+    const cache = {};
+
+    async function fetchAvailability(date) {
+        if (!cache[date]) {
+            cache[date] = fetch(`/api/availability/?date=${encodeURIComponent(date)}`)
+                .then(response => response.ok ? response.json() : null)
+                .catch(() => null);
+        }
+        return cache[date];
+    }
+
+    async function refreshTimes() {
+        const options = timeSelect.querySelectorAll('option[value]:not([value=""])');
+        options.forEach(option => {
+            option.disabled = false;
+            option.textContent = option.textContent.replace(' (Full)', '');
+        });
+        if (!dateInput.value) return;
+
+        const data = await fetchAvailability(dateInput.value);
+        if (!data || data.capacity === null) return;
+
+        const guests = parseInt(guestsSelect.value, 10) || 1;
+        const remaining = {};
+        data.slots.forEach(slot => { remaining[slot.time] = slot.remaining; });
+
+        options.forEach(option => {
+            if (option.value in remaining && remaining[option.value] < guests) {
+                option.disabled = true;
+                option.textContent += ' (Full)';
+                if (option.selected) timeSelect.value = '';
+            }
+        });
+    }
+
+    dateInput.addEventListener('change', refreshTimes);
+    guestsSelect.addEventListener('change', refreshTimes);
+});
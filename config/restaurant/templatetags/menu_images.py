@@ -0,0 +1,35 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from ..images import srcset
+
+register = template.Library()
+
+
+def _field(item, name):
+    # Menu items arrive as models (home page) or snapshot dicts (online order)
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+
+@register.inclusion_tag('restaurant/menu_picture.html')
+def menu_picture(item, sizes, placeholder='https://via.placeholder.com/300', lazy=True):
+    """
+    A menu item's image: a <picture> with WebP and JPEG srcsets when
+    derivatives exist, otherwise a plain <img> of the remote image URL.
+    """
+    variants = _field(item, 'image_variants') or {}
+    jpeg = variants.get('jpeg', {})
+    if jpeg:
+        # src for browsers without srcset: the middle width
+        widths = sorted(jpeg, key=int)
+        src = default_storage.url(jpeg[widths[len(widths) // 2]])
+    else:
+        src = _field(item, 'image') or placeholder
+    return {
+        'alt': _field(item, 'name'),
+        'src': src,
+        'sizes': sizes,
+        'lazy': lazy,
+        'webp_srcset': srcset(variants, 'webp'),
+        'jpeg_srcset': srcset(variants, 'jpeg'),
+    }
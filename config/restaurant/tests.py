@@ -0,0 +1,1080 @@
+import asyncio
+import re
+import tempfile
+import threading
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import stripe
+from PIL import Image
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import (
+    AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.admin import OrderAdmin
+from restaurant.availability import day_availability, has_capacity
+from restaurant.models import (
+    DailyItemSales, DiningTable, HourlySales, MenuItem, Order, OrderItem, OutboxMessage, Reservation, StripeEvent,
+)
+from restaurant.backends import client_ip
+from restaurant.cart import get_cached_cart_count, set_cached_cart_count
+from restaurant.catalog import get_menu_snapshot, seed_default_menu
+from restaurant.events import hub
+from restaurant.images import build_menu_item_images, render_derivatives
+from restaurant.notifications import HANDLERS
+from restaurant.outbox import claim_due, make_executor, process_batch, retry_delay
+from restaurant.payments import PaymentClient, PaymentUnavailable
+from restaurant.reporting import rebuild_rollups, sync_order_rollups_message
+from restaurant.search import MenuSearchIndex
+from restaurant.views import order_status_stream
+
+
+class SendTestWebhookTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.order = Order.objects.create(
+            user=user, status='pending', total_amount=0, pickup_time=timezone.now(),
+        )
+
+    def send(self, *args):
+        out = StringIO()
+        call_command('send_test_webhook', self.order.id, *args, stdout=out)
+        return out.getvalue().splitlines()
+
+    @override_settings(ALLOWED_HOSTS=['grilli.example.com'])
+    def test_in_process_delivery_uses_an_allowed_host(self):
+        lines = self.send('--event-id', 'evt_test_1', '--repeat', '2')
+        self.assertIn('HTTP 200', lines[0])
+        self.assertIn('"success"', lines[0])
+        self.assertIn('HTTP 200', lines[1])
+        self.assertIn('"duplicate"', lines[1])
+        self.assertEqual(StripeEvent.objects.filter(event_id='evt_test_1').count(), 1)
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_wildcard_allowed_hosts(self):
+        self.assertIn('HTTP 200', self.send()[0])
+
+
+class PaymentClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = PaymentClient('sk_test', max_retries=0, breaker_threshold=2, breaker_reset_seconds=60)
+        self.calls = []
+        self.order = SimpleNamespace(id=7, user_id=3, get_total_with_tax=lambda: 118)
+
+    def stub(self, create):
+        self.client.stripe = SimpleNamespace(payment_intents=SimpleNamespace(create=create))
+
+    async def test_acreate_payment_intent_runs_off_the_event_loop(self):
+        def create(params, options):
+            self.calls.append((threading.current_thread(), params, options))
+            return {'id': 'pi_1', 'client_secret': 'secret'}
+        self.stub(create)
+
+        intent = await self.client.acreate_payment_intent(self.order)
+
+        self.assertEqual(intent['id'], 'pi_1')
+        thread, params, options = self.calls[0]
+        self.assertIsNot(thread, threading.main_thread())
+        self.assertEqual(params['amount'], 11800)
+        self.assertEqual(options['idempotency_key'], 'order-7-11800')
+
+    async def test_async_calls_share_the_circuit_breaker(self):
+        def create(params, options):
+            raise stripe.APIConnectionError("connection refused")
+        self.stub(create)
+
+        for _ in range(2):
+            with self.assertRaises(PaymentUnavailable):
+                await self.client.acreate_payment_intent(self.order)
+        self.assertEqual(self.client.breaker.state, 'open')
+        with self.assertRaisesMessage(PaymentUnavailable, "circuit is open"):
+            self.client.create_payment_intent(self.order)
+
+
+# SQLite: "SEARCH" is a bounded index lookup, "SCAN <table>" without
+# "USING ... INDEX" a full table scan and "TEMP B-TREE FOR ORDER BY" a
+# sort. PostgreSQL: "Index Cond", "Seq Scan" and a "Sort" node.
+BOUNDED = re.compile(r'\bSEARCH\b|\bIndex Cond\b')
+TABLE_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)|\bSeq Scan on\b')
+SORT = re.compile(r'\bTEMP B-TREE FOR ORDER BY\b|^\s*(->\s*)?Sort\b', re.M)
+
+# Placeholder ids; the planner's choice of index does not depend on them
+USER_ID = ORDER_ID = MENU_ITEM_ID = 1
+
+
+class QueryPlanTests(TestCase):
+    """The lookups on the request path must stay index-backed"""
+
+    def assertPlan(self, name, queryset, bounded=True):
+        plan = queryset.explain()
+        with self.subTest(name, plan=plan):
+            self.assertIsNone(TABLE_SCAN.search(plan), "table scan")
+            self.assertIsNone(SORT.search(plan), "sorts instead of reading an index in order")
+            if bounded:
+                self.assertIsNotNone(BOUNDED.search(plan), "reads an unbounded index range")
+
+    def test_hot_lookups_search_an_index(self):
+        since = timezone.now() - timedelta(days=1)
+        searches = {
+            'cart lookup': Order.objects.filter(user_id=USER_ID, status='pending'),
+            'cart badge': Order.objects.filter(user_id=USER_ID, status='pending')
+            .values_list('item_count', flat=True),
+            'order history page': Order.objects.filter(user_id=USER_ID).exclude(status='pending')
+            .order_by('-created_at', '-id'),
+            'order status': Order.objects.filter(id=ORDER_ID),
+            'order status batch': Order.objects.filter(id__in=[1, 2, 3], user_id=USER_ID),
+            'orders since': Order.objects.filter(created_at__gte=since).order_by('-created_at'),
+            'cart line merge': OrderItem.objects.filter(order_id=ORDER_ID, menu_item_id=MENU_ITEM_ID),
+            'order items': OrderItem.objects.filter(order_id__in=[1, 2, 3]),
+            'reservations by user': Reservation.objects.filter(user_id=USER_ID).order_by('-date', '-time'),
+        }
+        for name, queryset in searches.items():
+            self.assertPlan(name, queryset)
+
+    def test_newest_orders_page_reads_the_created_at_index(self):
+        # No bound to search on, but walking the index newest-first stops
+        # after one page, where a table scan or a sort reads every order
+        queryset = Order.objects.order_by('-created_at')[:100]
+        self.assertPlan('newest orders page', queryset, bounded=False)
+        self.assertIn('order_created_at', queryset.explain())
+
+
+class OrderStatusStreamTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.order = Order.objects.create(
+            user=self.user, status='preparing', total_amount=0, pickup_time=timezone.now(),
+        )
+
+    async def test_update_published_before_streaming_starts_is_delivered(self):
+        request = AsyncRequestFactory().get(f'/api/order-status/{self.order.id}/stream/')
+        request.user = self.user
+        response = await order_status_stream(request, self.order.id)
+        # Lands after the snapshot was read but before the body is iterated
+        hub.dispatch(self.order.id, {'id': self.order.id, 'status': 'completed'})
+
+        async def read_all():
+            return [chunk async for chunk in response.streaming_content]
+        chunks = await asyncio.wait_for(read_all(), timeout=5)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertIn(b'"preparing"', chunks[0])
+        self.assertIn(b'"completed"', chunks[1])
+        self.assertEqual(hub.subscriber_count(), 0)
+
+
+class MenuSearchApiTests(TestCase):
+
+    def setUp(self):
+        seed_default_menu()
+
+    def search(self, **params):
+        return self.client.get('/api/menu/search/', {'q': 'grilled', **params})
+
+    def test_limit_must_be_positive(self):
+        for limit in ('0', '-1', 'ten'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.search(limit=limit).status_code, 400)
+
+    def test_limit_caps_the_results(self):
+        everything = self.search().json()['results']
+        self.assertGreater(len(everything), 1)
+        self.assertEqual(self.search(limit=1).json()['results'], everything[:1])
+
+
+@override_settings(LOGIN_THROTTLE={'IP_LIMIT': 3, 'ACCOUNT_LIMIT': 2, 'WINDOW': 60})
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('diner', 'diner@example.com', 'right-password')
+
+    def login(self, username, password, address='203.0.113.7', **meta):
+        request = RequestFactory().post('/login/', REMOTE_ADDR=address, **meta)
+        return authenticate(request, username=username, password=password)
+
+    def test_username_or_email_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(self.login('diner@example.com', 'right-password'))
+        self.assertIsNotNone(self.login('diner', 'right-password'))
+
+    def test_account_locks_after_failures(self):
+        for _ in range(2):
+            self.assertIsNone(self.login('diner', 'wrong', address=f'198.51.100.{_}'))
+        self.assertIsNone(self.login('diner', 'right-password', address='192.0.2.1'))
+
+    def test_client_address_locks_after_failures(self):
+        for n in range(3):
+            self.login(f'nobody{n}', 'wrong')
+        self.assertIsNone(self.login('diner', 'right-password'))
+        self.assertIsNotNone(self.login('diner', 'right-password', address='192.0.2.1'))
+
+    @override_settings(LOGIN_THROTTLE={
+        'IP_LIMIT': 3, 'ACCOUNT_LIMIT': 10, 'WINDOW': 60,
+        'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR', 'TRUSTED_PROXIES': 1,
+    })
+    def test_clients_behind_a_proxy_get_their_own_bucket(self):
+        proxy = '10.0.0.1'
+        for n in range(3):
+            # The attacker's own X-Forwarded-For entry is ignored
+            self.login(f'nobody{n}', 'wrong', address=proxy, HTTP_X_FORWARDED_FOR=f'1.2.3.{n}, 198.51.100.9')
+        self.assertIsNone(self.login('diner', 'right-password', address=proxy,
+                                     HTTP_X_FORWARDED_FOR='198.51.100.9'))
+        self.assertIsNotNone(self.login('diner', 'right-password', address=proxy,
+                                        HTTP_X_FORWARDED_FOR='192.0.2.44'))
+
+    @override_settings(LOGIN_THROTTLE={'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR', 'TRUSTED_PROXIES': 2})
+    def test_client_ip_counts_trusted_proxies_from_the_right(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.2',
+                                       HTTP_X_FORWARDED_FOR='6.6.6.6, 198.51.100.9, 10.0.0.1')
+        self.assertEqual(client_ip(request), '198.51.100.9')
+        self.assertEqual(client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.2')), '10.0.0.2')
+
+
+class CartTotalsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.soup = MenuItem.objects.create(name='Soup', price=Decimal('120.00'), category='starters')
+        self.curry = MenuItem.objects.create(name='Curry', price=Decimal('350.00'), category='mains')
+        self.cart = Order.objects.create(
+            user=self.user, status='pending', total_amount=0, pickup_time=timezone.now(),
+        )
+
+    def test_add_item_merges_lines_and_shifts_totals(self):
+        self.cart.add_item(self.soup, 2)
+        self.cart.add_item(self.curry, 1)
+        self.cart.add_item(self.soup, 1, {'Spice Level': 'Hot'})
+
+        line = self.cart.items.get(menu_item=self.soup)
+        self.assertEqual((line.quantity, line.item_total), (3, Decimal('360.00')))
+        self.assertEqual(line.selected_options, {'Spice Level': 'Hot'})
+        self.assertEqual(self.cart.items.count(), 2)
+        self.assertEqual(self.cart.total_amount, Decimal('710.00'))
+        self.assertEqual(self.cart.item_count, 4)
+        stored = Order.objects.get(pk=self.cart.pk)
+        self.assertEqual((stored.total_amount, stored.item_count), (Decimal('710.00'), 4))
+
+    def test_deltas_from_stale_instances_add_up(self):
+        other = Order.objects.get(pk=self.cart.pk)
+        self.cart.add_item(self.soup, 1)
+        other.add_item(self.curry, 2)
+
+        stored = Order.objects.get(pk=self.cart.pk)
+        self.assertEqual((stored.total_amount, stored.item_count), (Decimal('820.00'), 3))
+
+    def test_set_item_quantity_reprices_and_removes_lines(self):
+        self.cart.add_item(self.soup, 2)
+        self.cart.add_item(self.curry, 1)
+        soup = self.cart.items.get(menu_item=self.soup)
+
+        self.cart.set_item_quantity(soup, 5)
+        self.assertEqual(OrderItem.objects.get(pk=soup.pk).item_total, Decimal('600.00'))
+        self.assertEqual((self.cart.total_amount, self.cart.item_count), (Decimal('950.00'), 6))
+
+        self.cart.set_item_quantity(soup, 0)
+        self.assertFalse(OrderItem.objects.filter(pk=soup.pk).exists())
+        self.assertEqual((self.cart.total_amount, self.cart.item_count), (Decimal('350.00'), 1))
+
+    def test_non_positive_quantities_are_rejected(self):
+        for quantity in (0, -2):
+            with self.assertRaises(ValueError):
+                self.cart.add_item(self.soup, quantity)
+        self.assertFalse(self.cart.items.exists())
+
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('add_to_cart'), {'menu_item_id': self.soup.id, 'quantity': -1},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=self.cart.pk).total_amount, Decimal('0.00'))
+
+    def test_full_save_does_not_write_back_a_stale_item_count(self):
+        stale = Order.objects.get(pk=self.cart.pk)
+        self.cart.add_item(self.soup, 2)
+        stale.special_instructions = 'No onions'
+        stale.save()
+
+        stored = Order.objects.get(pk=self.cart.pk)
+        self.assertEqual(stored.item_count, 2)
+        self.assertEqual(stored.special_instructions, 'No onions')
+
+    def test_badge_follows_the_committed_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cart.add_item(self.soup, 3)
+        self.assertEqual(get_cached_cart_count(self.user.id), 3)
+
+    def test_backfill_recounts_items_from_the_lines(self):
+        self.cart.add_item(self.soup, 2)
+        self.cart.add_item(self.curry, 3)
+        empty = Order.objects.create(
+            user=None, status='completed', total_amount=0, pickup_time=timezone.now(),
+        )
+        Order.objects.update(item_count=99)
+        set_cached_cart_count(self.user.id, 99)
+
+        call_command('backfill_item_counts', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(Order.objects.get(pk=self.cart.pk).item_count, 5)
+        self.assertEqual(Order.objects.get(pk=empty.pk).item_count, 0)
+        self.assertIsNone(get_cached_cart_count(self.user.id))
+
+
+class OrderHistoryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        soup = MenuItem.objects.create(name='Soup', price=Decimal('120.00'), category='starters')
+        start = timezone.now() - timedelta(days=30)
+        for index in range(23):
+            status = 'cancelled' if index % 5 == 0 else 'completed'
+            order = Order.objects.create(
+                user=self.user, status=status, total_amount=120, pickup_time=start,
+            )
+            OrderItem.objects.create(order=order, menu_item=soup, quantity=1)
+            # Pairs of orders share a timestamp so pages must break ties on id
+            Order.objects.filter(pk=order.pk).update(created_at=start + timedelta(hours=index // 2))
+        Order.objects.create(user=self.user, status='pending', total_amount=0, pickup_time=start)
+        Order.objects.create(user=other, status='completed', total_amount=0, pickup_time=start)
+        self.client.force_login(self.user)
+
+    def walk(self, query=''):
+        """Follow the Older Orders links, returning each page's order ids and query count"""
+        pages = []
+        while query is not None:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"{reverse('order_history')}?{query}")
+            pages.append(([order.id for order in response.context['orders']], len(queries)))
+            query = response.context['next_query']
+        return pages
+
+    def expected(self, **filters):
+        return list(Order.objects.filter(user=self.user, **filters).exclude(status='pending')
+                    .order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_pages_cover_every_order_once_in_order(self):
+        pages = self.walk()
+
+        self.assertEqual([len(ids) for ids, _ in pages], [10, 10, 3])
+        self.assertEqual([order_id for ids, _ in pages for order_id in ids], self.expected())
+        # Deep pages cost the same as the first, items included
+        self.assertEqual(len({count for _, count in pages}), 1)
+
+    def test_cursor_keeps_the_status_filter(self):
+        pages = self.walk('status=completed')
+
+        self.assertEqual([order_id for ids, _ in pages for order_id in ids],
+                         self.expected(status='completed'))
+        self.assertEqual(len(pages), 2)
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        response = self.client.get(reverse('order_history'), {'before': 'yesterday_x'})
+
+        self.assertTrue(response.context['is_first_page'])
+        self.assertEqual([order.id for order in response.context['orders']], self.expected()[:10])
+
+
+class BulkOrderStatusTests(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', 'chef@example.com', 'password', is_staff=True)
+        self.diner = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.orders = {
+            status: Order.objects.create(
+                user=self.diner if status == 'pending' else None,
+                status=status, total_amount=100, pickup_time=timezone.now(),
+            )
+            for status in ('pending', 'confirmed', 'preparing', 'completed')
+        }
+
+    def post(self, user, payload):
+        self.client.force_login(user)
+        return self.client.post(reverse('bulk_update_order_status'), payload, content_type='application/json')
+
+    def test_moves_only_orders_whose_status_allows_it(self):
+        ids = [order.id for order in self.orders.values()] + [9999]
+        with CaptureQueriesContext(connection) as queries:
+            updated, rejected = Order.bulk_update_status(ids, 'cancelled')
+
+        cancelled = {self.orders[status].id for status in ('pending', 'confirmed', 'preparing')}
+        self.assertEqual({order.id for order in updated}, cancelled)
+        self.assertEqual(rejected, sorted([self.orders['completed'].id, 9999]))
+        self.assertEqual(Order.objects.get(pk=self.orders['completed'].pk).status, 'completed')
+        order_updates = [query for query in queries if query['sql'].startswith('UPDATE "restaurant_order"')]
+        self.assertEqual(len(order_updates), 1)
+
+    def test_an_order_that_moved_on_is_rejected(self):
+        stale = self.orders['confirmed']
+        Order.objects.filter(pk=stale.pk).update(status='cancelled')
+
+        updated, rejected = Order.bulk_update_status([stale.id], 'preparing')
+
+        self.assertEqual((updated, rejected), ([], [stale.id]))
+        self.assertEqual(Order.objects.get(pk=stale.pk).status, 'cancelled')
+
+    def test_stamps_the_first_arrival_and_queues_side_effects(self):
+        earlier = timezone.now() - timedelta(hours=1)
+        confirmed = self.orders['confirmed']
+        Order.objects.filter(pk=confirmed.pk).update(preparing_at=earlier)
+
+        updated, _ = Order.bulk_update_status([confirmed.id, self.orders['pending'].id], 'preparing')
+
+        self.assertEqual([order.id for order in updated], [confirmed.id])
+        self.assertEqual(updated[0].preparing_at, earlier)
+        self.assertEqual(
+            list(OutboxMessage.objects.filter(kind='order_status').values_list('payload', flat=True)),
+            [{'order_id': confirmed.id, 'status': 'preparing'}],
+        )
+
+    def test_endpoint_is_for_staff_only(self):
+        response = self.post(self.diner, {'order_ids': [self.orders['confirmed'].id], 'status': 'preparing'})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Order.objects.get(pk=self.orders['confirmed'].pk).status, 'confirmed')
+
+    def test_endpoint_reports_updated_and_rejected_orders(self):
+        confirmed, completed = self.orders['confirmed'], self.orders['completed']
+        response = self.post(self.staff, {'order_ids': [confirmed.id, completed.id], 'status': 'preparing'})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([order['id'] for order in body['orders']], [confirmed.id])
+        self.assertEqual(body['orders'][0]['status'], 'preparing')
+        self.assertEqual(body['rejected'], [completed.id])
+
+    def test_endpoint_rejects_unreachable_statuses_and_bad_ids(self):
+        self.assertEqual(self.post(self.staff, {'order_ids': [1], 'status': 'pending'}).status_code, 400)
+        self.assertEqual(self.post(self.staff, {'order_ids': ['x'], 'status': 'ready'}).status_code, 400)
+
+
+class ReorderTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.soup = MenuItem.objects.create(name='Soup', price=Decimal('120.00'), category='starters')
+        self.curry = MenuItem.objects.create(name='Curry', price=Decimal('350.00'), category='mains')
+        self.first = self.past_order((self.soup, 2), (self.curry, 1))
+        self.second = self.past_order((self.soup, 1))
+        self.client.force_login(self.user)
+
+    def past_order(self, *lines, user=None):
+        order = Order.objects.create(
+            user=user or self.user, status='completed', total_amount=0, pickup_time=timezone.now(),
+        )
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity)
+        return order
+
+    def cart(self):
+        return Order.objects.get(user=self.user, status='pending')
+
+    def test_orders_merge_into_the_existing_cart_at_current_prices(self):
+        cart = Order.objects.create(user=self.user, status='pending', total_amount=0, pickup_time=timezone.now())
+        cart.add_item(self.soup, 1)
+        MenuItem.objects.filter(pk=self.soup.pk).update(price=Decimal('150.00'))
+
+        response = self.client.post(reverse('reorder_multiple'),
+                                    {'order_ids': [self.first.id, self.second.id]})
+
+        self.assertRedirects(response, reverse('view_cart'), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.filter(user=self.user, status='pending').count(), 1)
+        lines = {line.menu_item_id: line for line in self.cart().items.all()}
+        self.assertEqual((lines[self.soup.id].quantity, lines[self.soup.id].item_total), (4, Decimal('570.00')))
+        self.assertEqual((lines[self.curry.id].quantity, lines[self.curry.id].item_total), (1, Decimal('350.00')))
+        self.assertEqual((self.cart().total_amount, self.cart().item_count), (Decimal('920.00'), 5))
+
+    def test_single_reorder_creates_a_cart(self):
+        self.client.post(reverse('reorder', args=[self.second.id]))
+
+        self.assertEqual((self.cart().total_amount, self.cart().item_count), (Decimal('120.00'), 1))
+
+    def test_other_users_orders_and_deleted_items_are_skipped(self):
+        stranger = User.objects.create_user('other', 'other@example.com', 'password')
+        foreign = self.past_order((self.curry, 5), user=stranger)
+        retired = MenuItem.objects.create(name='Retired', price=Decimal('80.00'), category='desserts')
+        old = self.past_order((retired, 1), (self.soup, 1))
+        retired.delete()
+
+        self.client.post(reverse('reorder_multiple'), {'order_ids': [foreign.id, old.id]})
+
+        self.assertEqual(list(self.cart().items.values_list('menu_item', 'quantity')), [(self.soup.id, 1)])
+        self.assertEqual(self.cart().item_count, 1)
+
+    def test_writes_do_not_grow_with_the_number_of_lines(self):
+        for index in range(8):
+            item = MenuItem.objects.create(name=f'Dish {index}', price=Decimal('10.00'), category='mains')
+            OrderItem.objects.create(order=self.first, menu_item=item, quantity=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('reorder_multiple'), {'order_ids': [self.first.id, self.second.id]})
+
+        line_writes = [query for query in queries if query['sql'].startswith(('INSERT INTO "restaurant_orderitem"',
+                                                                             'UPDATE "restaurant_orderitem"'))]
+        self.assertEqual(len(line_writes), 1)
+        self.assertEqual(self.cart().item_count, 12)
+
+
+class ReservationCapacityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        DiningTable.objects.create(name='T1', seats=4)
+        DiningTable.objects.create(name='T2', seats=2)
+        DiningTable.objects.create(name='Patio', seats=8, is_active=False)
+        self.day = timezone.localdate() + timedelta(days=7)
+        self.client.force_login(self.user)
+
+    def book(self, at, guests, **extra):
+        return Reservation.objects.create(
+            user=self.user, name='Diner', phone='555', date=self.day, time=at, guests=guests, **extra,
+        )
+
+    def post_booking(self, at, guests):
+        return self.client.post(reverse('reservation'), {
+            'name': 'Diner', 'phone': '555', 'date': self.day.isoformat(), 'time': at, 'guests': guests,
+        })
+
+    def test_overlapping_seatings_share_the_active_tables(self):
+        self.book(time(18, 0), 4)
+
+        capacity, slots = day_availability(self.day)
+
+        self.assertEqual(capacity, 6)
+        remaining = {slot.strftime('%H:%M'): covers for slot, covers in slots.items()}
+        # 17:30 is still seated when the 18:00 party arrives; 19:30 is after it leaves
+        self.assertEqual([remaining[at] for at in ('17:30', '18:00', '19:00', '19:30')], [2, 2, 2, 6])
+        self.assertEqual(remaining['12:00'], 6)
+
+    def test_full_slots_are_refused(self):
+        self.book(time(18, 0), 4)
+
+        self.post_booking('18:30', 3)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+        self.assertRedirects(self.post_booking('18:30', 2), reverse('my_reservations'),
+                             fetch_redirect_response=False)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_a_modified_booking_does_not_count_against_itself(self):
+        reservation = self.book(time(18, 0), 4)
+
+        self.client.post(reverse('modify_reservation', args=[reservation.id]), {
+            'name': 'Diner', 'phone': '555', 'date': self.day.isoformat(), 'time': '18:00', 'guests': 6,
+        })
+
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).guests, 6)
+
+    def test_new_bookings_refresh_the_cached_availability(self):
+        self.assertEqual(day_availability(self.day)[1][time(18, 0)], 6)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(time(18, 0), 2)
+
+        response = self.client.get(reverse('availability_api'), {'date': self.day.isoformat()})
+
+        slots = {slot['time']: slot['remaining'] for slot in response.json()['slots']}
+        self.assertEqual(slots['18:00'], 4)
+
+    def test_without_tables_nothing_is_limited(self):
+        DiningTable.objects.all().delete()
+
+        self.assertTrue(has_capacity(self.day, time(18, 0), 50))
+        self.assertEqual(day_availability(self.day)[0], None)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+
+    def test_simultaneous_bookings_cannot_overfill_a_slot(self):
+        DiningTable.objects.create(name='T1', seats=6)
+        users = [User.objects.create_user(f'diner{index}', password='password') for index in range(6)]
+        day = timezone.localdate() + timedelta(days=7)
+        start = threading.Barrier(len(users))
+
+        def book(user):
+            try:
+                client = Client()
+                client.force_login(user)
+                start.wait()
+                client.post(reverse('reservation'), {
+                    'name': user.username, 'phone': '555', 'date': day.isoformat(), 'time': '19:00', 'guests': 2,
+                })
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=[user]) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Reservation.objects.filter(date=day).count(), 3)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BACKOFF_SECONDS=30, OUTBOX_RETRY_BACKOFF_MAX_SECONDS=100)
+class OutboxTests(TransactionTestCase):
+
+    def setUp(self):
+        self.delivered = []
+
+        def deliver(payload):
+            self.delivered.append(payload)
+
+        def fail(payload):
+            raise ConnectionError("SMTP unavailable")
+
+        handlers = mock.patch.dict(HANDLERS, {'test_deliver': deliver, 'test_fail': fail})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def drain(self):
+        with make_executor(2) as executor:
+            return process_batch(executor, 10)
+
+    def drain_failing(self):
+        with self.assertLogs('restaurant.outbox', 'ERROR'):
+            return self.drain()
+
+    def test_messages_leave_with_their_transaction(self):
+        with transaction.atomic():
+            OutboxMessage.enqueue('test_deliver', order_id=1)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            OutboxMessage.enqueue('test_deliver', order_id=2)
+            raise RuntimeError("request failed")
+
+        self.assertEqual(self.drain(), {'sent': 1})
+        self.assertEqual(self.delivered, [{'order_id': 1}])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+        self.assertIsNotNone(message.sent_at)
+        self.assertEqual(self.drain(), {})
+
+    def test_failures_back_off_then_give_up(self):
+        message = OutboxMessage.enqueue('test_fail', order_id=1)
+
+        before = timezone.now()
+        self.assertEqual(self.drain_failing(), {'retry': 1})
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('SMTP unavailable', message.last_error)
+        self.assertTrue(before + timedelta(seconds=15) <= message.available_at <= timezone.now() + timedelta(seconds=30))
+        # Not due yet
+        self.assertEqual(self.drain(), {})
+
+        for outcome in ('retry', 'failed'):
+            OutboxMessage.objects.filter(pk=message.pk).update(available_at=timezone.now())
+            self.assertEqual(self.drain_failing(), {outcome: 1})
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 3))
+        self.assertEqual(self.drain(), {})
+
+    def test_unknown_kinds_are_retried_not_dropped(self):
+        OutboxMessage.enqueue('no_such_kind')
+
+        self.assertEqual(self.drain(), {'retry': 1})
+        self.assertIn("No handler for 'no_such_kind'", OutboxMessage.objects.get().last_error)
+
+    def test_a_message_is_claimed_once(self):
+        first = OutboxMessage.enqueue('test_deliver', n=1)
+        later = OutboxMessage.enqueue('test_deliver', n=2)
+        OutboxMessage.objects.filter(pk=later.pk).update(available_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual([message.id for message in claim_due(10)], [first.id])
+        self.assertEqual(claim_due(10), [])
+        # The lease runs out if the worker dies before recording the outcome
+        OutboxMessage.objects.filter(pk=first.pk).update(available_at=timezone.now())
+        self.assertEqual([message.id for message in claim_due(10)], [first.id])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        with mock.patch('restaurant.outbox.random.uniform', return_value=1.0):
+            self.assertEqual([retry_delay(attempts) for attempts in (1, 2, 3, 4)], [30, 60, 100, 100])
+
+    def test_run_outbox_once_drains_what_is_due(self):
+        OutboxMessage.enqueue_many('test_deliver', [{'n': n} for n in range(3)])
+        out = StringIO()
+
+        call_command('run_outbox', '--once', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(sorted(payload['n'] for payload in self.delivered), [0, 1, 2])
+        self.assertEqual(out.getvalue().splitlines(), ['2 sent', '1 sent'])
+
+
+class MenuImageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        media_settings = override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/')
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def original(self, name, size, color='red'):
+        path = self.media_root / 'menu/originals' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new('RGB', size, color).save(path, 'JPEG')
+        return path
+
+    def test_derivatives_are_resized_but_never_upscaled(self):
+        large = render_derivatives(self.original('large.jpg', (1000, 500)), self.media_root)
+        small = render_derivatives(self.original('small.jpg', (400, 300)), self.media_root)
+
+        self.assertEqual(set(large), {'webp', 'jpeg'})
+        self.assertEqual(list(large['webp']), ['320', '480', '800'])
+        self.assertEqual(list(small['jpeg']), ['320', '400'])
+        with Image.open(self.media_root / large['webp']['480']) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (480, 240)))
+        with Image.open(self.media_root / small['jpeg']['400']) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (400, 300)))
+
+    def test_names_follow_the_content(self):
+        path = self.original('dish.jpg', (600, 400))
+        first = render_derivatives(path, self.media_root)
+        written = (self.media_root / first['jpeg']['320']).stat().st_mtime_ns
+
+        self.assertEqual(render_derivatives(path, self.media_root), first)
+        self.assertEqual((self.media_root / first['jpeg']['320']).stat().st_mtime_ns, written)
+
+        self.original('dish.jpg', (600, 400), color='blue')
+        self.assertNotEqual(render_derivatives(path, self.media_root)['jpeg']['320'], first['jpeg']['320'])
+
+    def test_outbox_handler_stores_the_variants(self):
+        self.original('soup.jpg', (900, 600))
+        item = MenuItem.objects.create(name='Soup', price=120, category='starters', photo='menu/originals/soup.jpg')
+
+        build_menu_item_images({'menu_item_id': item.id})
+
+        item.refresh_from_db()
+        self.assertEqual(list(item.image_variants['jpeg']), ['320', '480', '800'])
+        self.assertTrue((self.media_root / item.image_variants['webp']['800']).exists())
+
+    def test_build_menu_images_updates_only_changed_items(self):
+        self.original('soup.jpg', (500, 500))
+        with_photo = MenuItem.objects.create(name='Soup', price=120, category='starters',
+                                             photo='menu/originals/soup.jpg')
+        MenuItem.objects.create(name='Curry', price=350, category='mains', image='https://example.com/curry.jpg')
+
+        out = StringIO()
+        call_command('build_menu_images', '--workers', '1', stdout=out)
+        call_command('build_menu_images', '--workers', '1', stdout=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            "1 photo(s) processed, 1 item(s) updated",
+            "1 photo(s) processed, 0 item(s) updated",
+        ])
+        self.assertEqual(list(MenuItem.objects.get(pk=with_photo.pk).image_variants['webp']), ['320', '480', '500'])
+
+    def test_menu_picture_offers_srcsets_smallest_first(self):
+        variants = {
+            'webp': {'1200': 'menu/derived/a-1200.webp', '320': 'menu/derived/a-320.webp'},
+            'jpeg': {'1200': 'menu/derived/a-1200.jpeg', '320': 'menu/derived/a-320.jpeg', '480': 'menu/derived/a-480.jpeg'},
+        }
+        html = Template("{% load menu_images %}{% menu_picture item '50vw' %}").render(Context({
+            'item': {'name': 'Soup', 'image_variants': variants},
+        }))
+
+        self.assertIn('srcset="/media/menu/derived/a-320.webp 320w, /media/menu/derived/a-1200.webp 1200w"', html)
+        self.assertIn('src="/media/menu/derived/a-480.jpeg"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_menu_picture_falls_back_to_the_remote_image(self):
+        item = MenuItem(name='Curry', price=350, category='mains', image='https://example.com/curry.jpg')
+
+        html = Template("{% load menu_images %}{% menu_picture item '50vw' lazy=False %}").render(
+            Context({'item': item}))
+
+        self.assertHTMLEqual(html, '<img src="https://example.com/curry.jpg" alt="Curry">')
+
+
+class MenuSearchIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        dishes = [
+            ('Paneer Tikka', 'Cottage cheese grilled in the tandoor', 'starters'),
+            ('Tandoori Chicken', 'Chicken marinated in yoghurt and grilled', 'mains'),
+            ('Grilled Prawns', 'Tiger prawns with garlic butter', 'seafood'),
+            ('Fish Curry', 'Kerala style curry with grilled fish', 'seafood'),
+            ('Crème Brûlée', 'Vanilla custard', 'desserts'),
+            ('Chicken Curry', 'Slow cooked chicken curry', 'mains'),
+        ]
+        self.items = [
+            SimpleNamespace(id=index + 1, name=name, description=description, category=category)
+            for index, (name, description, category) in enumerate(dishes)
+        ]
+        self.index = MenuSearchIndex(self.items)
+
+    def names(self, query, **kwargs):
+        return [item.name for item, _ in self.index.search(query, **kwargs)]
+
+    def test_name_matches_outrank_description_matches(self):
+        self.assertEqual(self.names('grilled')[0], 'Grilled Prawns')
+        self.assertEqual(set(self.names('grilled')),
+                         {'Paneer Tikka', 'Tandoori Chicken', 'Grilled Prawns', 'Fish Curry'})
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.names('chicken curry'), ['Chicken Curry'])
+        self.assertEqual(self.names('chicken prawns'), [])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.names('tand'), ['Tandoori Chicken', 'Paneer Tikka'])
+        self.assertEqual(self.names('tand chick'), [])
+        self.assertEqual(self.names('tandoori chick'), ['Tandoori Chicken'])
+
+    def test_accents_and_case_are_folded(self):
+        self.assertEqual(self.names('CREME brulee'), ['Crème Brûlée'])
+
+    def test_repeated_terms_rank_higher_and_ties_break_on_id(self):
+        # Chicken Curry says curry twice in its description, Fish Curry once
+        self.assertEqual(self.names('curry'), ['Chicken Curry', 'Fish Curry'])
+
+        twins = [SimpleNamespace(id=pk, name='Dal Makhani', description='', category='mains') for pk in (9, 3)]
+        results = MenuSearchIndex(twins).search('dal')
+        self.assertEqual(results[0][1], results[1][1])
+        self.assertEqual([item.id for item, _ in results], [3, 9])
+
+    def test_categories_and_limit(self):
+        self.assertEqual(self.names('grilled', categories=['seafood']), ['Grilled Prawns', 'Fish Curry'])
+        self.assertEqual(len(self.names('grilled', limit=2)), 2)
+        self.assertEqual(self.names('   '), [])
+
+
+class MenuSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        seed_default_menu()
+
+    def test_api_returns_the_index_ranking(self):
+        response = self.client.get(reverse('menu_search_api'), {'q': 'grilled', 'category': 'seafood'})
+
+        results = response.json()['results']
+        expected = get_menu_snapshot().search_index.search('grilled', categories=['seafood'])
+        self.assertEqual([result['id'] for result in results], [item.id for item, _ in expected])
+        self.assertTrue(all(result['category'] == 'seafood' for result in results))
+
+    def test_api_rejects_unknown_categories(self):
+        response = self.client.get(reverse('menu_search_api'), {'q': 'grilled', 'category': 'drinks'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_new_items_are_searchable_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = MenuItem.objects.create(name='Zucchini Fritters', description='', price=150, category='starters')
+
+        response = self.client.get(reverse('menu_search_api'), {'q': 'zucc'})
+
+        self.assertEqual([result['id'] for result in response.json()['results']], [item.id])
+
+    def test_admin_search_keeps_the_ranking(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        self.client.cookies['admin_sessionid'] = self.client.cookies['sessionid'].value
+
+        response = self.client.get(reverse('admin:restaurant_menuitem_changelist'), {'q': 'grilled'})
+
+        expected = get_menu_snapshot().search_index.search('grilled', limit=None)
+        self.assertGreater(len(expected), 1)
+        self.assertEqual([item.id for item in response.context['cl'].result_list],
+                         [item.id for item, _ in expected][:100])
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('diner', 'diner@example.com', 'password')
+        self.soup = MenuItem.objects.create(name='Soup', price=Decimal('120.00'), category='starters')
+        self.curry = MenuItem.objects.create(name='Curry', price=Decimal('350.00'), category='mains')
+
+    def order(self, *lines, user=None):
+        order = Order.objects.create(user=user, status='pending', total_amount=0, pickup_time=timezone.now())
+        for menu_item, quantity in lines:
+            order.add_item(menu_item, quantity)
+        return order
+
+    def run_rollup_messages(self, repeat=1):
+        """Deliver the queued rollup messages, as the outbox worker would"""
+        messages = list(OutboxMessage.objects.filter(kind='order_rollups').order_by('id'))
+        for _ in range(repeat):
+            for message in messages:
+                sync_order_rollups_message(message.payload)
+        OutboxMessage.objects.filter(id__in=[message.id for message in messages]).delete()
+
+    def rollups(self):
+        return (
+            list(HourlySales.objects.exclude(orders=0).order_by('hour').values_list('hour', 'revenue', 'orders', 'covers')),
+            list(DailyItemSales.objects.exclude(quantity=0).order_by('day', 'menu_item')
+                 .values_list('day', 'menu_item', 'quantity', 'revenue')),
+        )
+
+    def assertMatchesRebuild(self):
+        self.run_rollup_messages()
+        maintained = self.rollups()
+        flags = list(Order.objects.order_by('id').values_list('id', 'rolled_up'))
+        rebuild_rollups()
+        self.assertEqual(maintained, self.rollups())
+        self.assertEqual(flags, list(Order.objects.order_by('id').values_list('id', 'rolled_up')))
+        return maintained
+
+    def test_confirmed_orders_are_counted_once(self):
+        first = self.order((self.soup, 2), (self.curry, 1))
+        second = self.order((self.soup, 1))
+        first.update_status('confirmed')
+        second.update_status('confirmed')
+        first.update_status('preparing')
+        self.run_rollup_messages(repeat=2)
+
+        (hour,), items = self.assertMatchesRebuild()
+        self.assertEqual(hour[1:], (Decimal('710.00'), 2, 4))
+        self.assertEqual([(menu_item, quantity) for _, menu_item, quantity, _ in items],
+                         [(self.soup.id, 3), (self.curry.id, 1)])
+
+    def test_cancelled_orders_leave_the_rollups(self):
+        order = self.order((self.soup, 2))
+        order.update_status('confirmed')
+        self.run_rollup_messages()
+        order.update_status('cancelled')
+
+        self.assertEqual(self.assertMatchesRebuild(), ([], []))
+        self.assertFalse(Order.objects.get(pk=order.pk).rolled_up)
+
+    def test_a_stale_save_is_reconciled_from_the_database(self):
+        order = self.order((self.curry, 1))
+        stale = Order.objects.get(pk=order.pk)
+        order.update_status('confirmed')
+        self.run_rollup_messages()
+
+        # Written back from an instance read before the confirmation
+        stale.special_instructions = 'Extra napkins'
+        stale.save()
+
+        self.assertEqual(self.assertMatchesRebuild(), ([], []))
+
+    def test_bulk_transitions_update_the_rollups(self):
+        orders = [self.order((self.soup, 1)) for _ in range(3)]
+        Order.bulk_update_status([order.id for order in orders], 'confirmed')
+        Order.bulk_update_status([orders[0].id], 'cancelled')
+
+        (hour,), _ = self.assertMatchesRebuild()
+        self.assertEqual(hour[1:], (Decimal('240.00'), 2, 2))
+
+    def test_deleted_orders_are_taken_out(self):
+        kept = self.order((self.soup, 1))
+        deleted = self.order((self.curry, 2))
+        Order.bulk_update_status([kept.id, deleted.id], 'confirmed')
+        self.run_rollup_messages()
+
+        deleted.delete()
+
+        (hour,), items = self.assertMatchesRebuild()
+        self.assertEqual(hour[1:], (Decimal('120.00'), 1, 1))
+        self.assertEqual([menu_item for _, menu_item, _, _ in items], [self.soup.id])
+
+    def test_dashboard_reads_the_rollups(self):
+        order = self.order((self.curry, 2))
+        order.update_status('confirmed')
+        self.run_rollup_messages()
+        staff = User.objects.create_user('manager', password='password', is_staff=True)
+
+        self.client.force_login(self.user)
+        self.assertNotEqual(self.client.get(reverse('sales_dashboard')).status_code, 200)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('sales_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['totals']['revenue'], Decimal('700.00'))
+
+
+@mock.patch.object(OrderAdmin, 'list_per_page', 4)
+class KeysetChangeListTests(TestCase):
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.orders = [
+            Order.objects.create(user=admin, status=status, total_amount=10, pickup_time=timezone.now())
+            for status in ['completed'] * 7 + ['cancelled'] * 3
+        ]
+        self.client.force_login(admin)
+        self.client.cookies['admin_sessionid'] = self.client.cookies['sessionid'].value
+        self.url = reverse('admin:restaurant_order_changelist')
+
+    def changelist(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{self.url}{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], queries
+
+    def ids(self, cl):
+        return [order.id for order in cl.result_list]
+
+    def test_older_and_newer_cursors_walk_the_table(self):
+        newest_first = [order.id for order in reversed(self.orders)]
+        pages, cl = [], None
+        query = ''
+        while query is not None:
+            cl, queries = self.changelist(query)
+            self.assertTrue(cl.keyset)
+            self.assertFalse([q for q in queries if 'OFFSET' in q['sql']])
+            pages.append(self.ids(cl))
+            query = cl.older_url
+
+        self.assertEqual(pages, [newest_first[:4], newest_first[4:8], newest_first[8:]])
+        back, _ = self.changelist(cl.newer_url)
+        self.assertEqual(self.ids(back), newest_first[4:8])
+        first, _ = self.changelist(back.newer_url)
+        self.assertEqual(self.ids(first), newest_first[:4])
+        self.assertIsNone(first.newer_url)
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        _, first = self.changelist()
+        _, deep = self.changelist(f'?before={self.orders[5].id}')
+
+        self.assertEqual(len(first), len(deep))
+
+    def test_filters_keep_the_cursor_but_new_filters_drop_it(self):
+        cl, _ = self.changelist('?status__exact=completed')
+        self.assertEqual(cl.older_url, f'?before={cl.result_list[-1].id}&status__exact=completed')
+
+        older, _ = self.changelist(cl.older_url)
+        self.assertEqual(self.ids(older), [order.id for order in self.orders[:3]][::-1])
+        self.assertNotIn('before', older.get_query_string({'status__exact': 'cancelled'}))
+
+    def test_sorting_by_a_column_uses_numbered_pages(self):
+        cl, _ = self.changelist('?o=3')
+
+        self.assertFalse(cl.keyset)
+        self.assertEqual(cl.paginator.num_pages, 3)
+
+    def test_counts_are_capped_or_estimated(self):
+        with mock.patch('restaurant.admin_lists.COUNT_LIMIT', 5):
+            cl, _ = self.changelist('?status__exact=completed')
+        self.assertEqual(cl.paginator.count_label, '5+')
+
+        with mock.patch('restaurant.admin_lists.ESTIMATE_THRESHOLD', 5):
+            cl, queries = self.changelist()
+        self.assertEqual(cl.paginator.count_label, f'about {self.orders[-1].id:,}')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'] and 'restaurant_order' in q['sql']])
+
+    def test_page_links_render(self):
+        response = self.client.get(self.url, {'before': self.orders[6].id})
+
+        self.assertContains(response, 'Newer</a>')
+        self.assertContains(response, 'Older &rsaquo;</a>')
+        self.assertContains(response, '10 orders')
@@ -10,6 +10,9 @@ urlpatterns = [
     path('my-reservations/', views.my_reservations, name='my_reservations'),
     path('modify-reservation/<int:reservation_id>/', views.modify_reservation, name='modify_reservation'),
     path('cancel-reservation/<int:reservation_id>/', views.cancel_reservation, name='cancel_reservation'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/availability/', views.availability_api, name='availability_api'),
+    path('api/menu/search/', views.menu_search_api, name='menu_search_api'),
     path('online-order/', views.online_order, name='online_order'),
     path('cart/', views.view_cart, name='view_cart'),
     path('add-to-cart/', views.add_to_cart, name='add_to_cart'),
@@ -20,6 +23,13 @@ urlpatterns = [
     path('order-history/', views.order_history, name='order_history'),
     path('track-order/<int:order_id>/', views.track_order, name='track_order'),
     path('toggle-favorite/<int:order_id>/', views.toggle_favorite_order, name='toggle_favorite'),
+    path('reorder/', views.reorder_multiple, name='reorder_multiple'),
     path('reorder/<int:order_id>/', views.reorder, name='reorder'),
+    path('staff/sales/', views.sales_dashboard, name='sales_dashboard'),
+    path('api/orders/bulk-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
+    path('api/order-status/', views.order_status_batch_api, name='order_status_batch_api'),
     path('api/order-status/<int:order_id>/', views.order_status_api, name='order_status_api'),
+    path('api/order-status/<int:order_id>/stream/', views.order_status_stream, name='order_status_stream'),
+    path('api/payment-intent/<int:order_id>/', views.create_payment_intent, name='create_payment_intent'),
+    path('webhooks/stripe/', views.stripe_webhook, name='stripe_webhook'),
 ]
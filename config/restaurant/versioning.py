@@ -0,0 +1,21 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """Return the shared version counter stored under key"""
+    version = cache.get(key)
+    if version is None:
+        # Start from a fresh value so a cleared cache never matches old derived data
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Move the counter on, invalidating everything derived from the old value"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
@@ -3,157 +3,46 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from .models import Reservation, MenuItem, Order, OrderItem, MenuItemOption
+from .models import Reservation, MenuItem, Order, OrderItem, MenuItemOption, OutboxMessage
 from .forms import SignUpForm
+from .catalog import get_menu_snapshot, home_menu_context
+from .events import TERMINAL_STATUSES, hub, serialize_order_status
+from .availability import day_availability, has_capacity
+from .backends import login_throttled
+from .webhooks import accept_stripe_event
+from .payments import PaymentUnavailable, get_payment_client
+from .reporting import sales_report
+from .metrics import registry as metrics_registry
 import re
 from datetime import date, datetime, timedelta
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 import json
+import asyncio
+import hashlib
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from decimal import Decimal  # Add this import at the top
 import stripe
 from django.conf import settings
-from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import Prefetch, Q
+from django.db import transaction
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
-def create_default_menu_items():
-    """Define default menu items with Indian Rupee prices"""
-    default_items = [
-        # Starters
-        {
-            "name": "Classic Bruschetta",
-            "price": 299.00,
-            "description": "Toasted bread topped with fresh tomatoes, basil, and extra virgin olive oil",
-            "image": "https://images.unsplash.com/photo-1506280754576-f6fa8a873550?w=800&q=80",
-            "category": "starters",
-        },
-        {
-            "name": "Crispy Calamari",
-            "price": 399.00,
-            "description": "Lightly fried squid rings served with lemon aioli",
-            "image": "https://images.unsplash.com/photo-1604909052743-94e838986d24?w=800&q=80",
-            "category": "starters",
-        },
-        {
-            "name": "Stuffed Mushrooms",
-            "price": 349.00,
-            "description": "Mushrooms stuffed with cheese and herbs",
-            "image": "https://images.unsplash.com/photo-1611599538835-b52a8c2af7fe?w=800&q=80",
-            "category": "starters",
-        },
-
-        # Mains
-        {
-            "name": "Grilled Ribeye Steak",
-            "price": 1299.00,
-            "description": "12oz prime ribeye with roasted garlic butter and seasonal vegetables",
-            "image": "https://images.unsplash.com/photo-1546964124-0cce460f38ef?w=800&q=80",
-            "category": "mains",
-        },
-        {
-            "name": "Herb Roasted Chicken",
-            "price": 699.00,
-            "description": "Free-range chicken with herbs, roasted potatoes, and natural jus",
-            "image": "https://images.unsplash.com/photo-1604908176997-125f25cc6f3d?w=800&q=80",
-            "category": "mains",
-        },
-        {
-            "name": "Margherita Pizza",
-            "price": 449.00,
-            "description": "Classic pizza with fresh tomatoes, mozzarella, basil, and olive oil",
-            "image": "https://images.unsplash.com/photo-1604068549290-dea0e4a305ca?w=800&q=80",
-            "category": "mains",
-        },
-
-        # Seafood
-        {
-            "name": "Pan-Seared Sea Bass",
-            "price": 1199.00,
-            "description": "Fresh sea bass fillet with crispy skin, served with saffron risotto and asparagus",
-            "image": "https://images.unsplash.com/photo-1615141982883-c7ad0e69fd62?w=800&q=80",
-            "category": "seafood",
-        },
-        {
-            "name": "Grilled Octopus",
-            "price": 899.00,
-            "description": "Tender octopus marinated in herbs and olive oil, served with roasted potatoes",
-            "image": "https://images.unsplash.com/photo-1585545335512-1e43f40d4999?w=800&q=80",
-            "category": "seafood",
-        },
-        {
-            "name": "Seafood Paella",
-            "price": 1299.00,
-            "description": "Spanish rice with mixed seafood, saffron, and seasonal vegetables",
-            "image": "https://images.unsplash.com/photo-1534080564583-6be75777b70a?w=800&q=80",
-            "category": "seafood",
-        },
-        {
-            "name": "Tuna Tartare",
-            "price": 799.00,
-            "description": "Fresh tuna diced and seasoned, served with avocado and crispy wontons",
-            "image": "https://images.unsplash.com/photo-1626645738196-c2a7c87a8f58?w=800&q=80",
-            "category": "seafood",
-        },
-
-        # Desserts
-        {
-            "name": "Chocolate Lava Cake",
-            "price": 299.00,
-            "description": "Warm chocolate cake with molten center and vanilla ice cream",
-            "image": "https://images.unsplash.com/photo-1624353365286-3f8d62daad51?w=800&q=80",
-            "category": "desserts",
-        },
-        {
-            "name": "Tiramisu",
-            "price": 349.00,
-            "description": "Classic Italian dessert with coffee-soaked ladyfingers and mascarpone",
-            "image": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9?w=800&q=80",
-            "category": "desserts",
-        },
-        {
-            "name": "Crème Brûlée",
-            "price": 299.00,
-            "description": "Rich vanilla custard with caramelized sugar crust",
-            "image": "https://images.unsplash.com/photo-1470124182917-cc6e71b22ecc?w=800&q=80",
-            "category": "desserts",
-        },
-    ]
-
-    # Create menu items if they don't exist
-    for item in default_items:
-        MenuItem.objects.get_or_create(
-            name=item["name"],
-            defaults={
-                "description": item["description"],
-                "price": item["price"],
-                "image": item["image"],
-                "category": item["category"],
-            }
-        )
-
 def home(request):
     """
     Renders your single-page front-end with dynamic menu items.
     """
-    # Seed the database with default menu items if they don't exist.
-    create_default_menu_items()
-    
-    # Query the menu items to pass to the template.
-    starters = MenuItem.objects.filter(category='starters')
-    mains = MenuItem.objects.filter(category='mains')
-    seafood = MenuItem.objects.filter(category='seafood')
-    desserts = MenuItem.objects.filter(category='desserts')
-    context = {
-        'starters': starters,
-        'mains': mains,
-        'seafood': seafood,
-        'desserts': desserts,
-    }
+    context = home_menu_context(get_menu_snapshot())
     return render(request, 'restaurant/index.html', context)
 
 def signup_view(request):
@@ -173,6 +62,7 @@ def signup_view(request):
                 request,
                 'restaurant/index.html',
                 {
+                    **home_menu_context(get_menu_snapshot()),
                     'signup_form': form,
                     'show_signup_modal': True,
                 }
@@ -183,6 +73,7 @@ def signup_view(request):
             request,
             'restaurant/index.html',
             {
+                **home_menu_context(get_menu_snapshot()),
                 'signup_form': form,
                 'show_signup_modal': True,
             }
@@ -192,16 +83,12 @@ def login_view(request):
     if request.method == 'POST':
         username_or_email = request.POST.get('username')
         password = request.POST.get('password')
+        if login_throttled(request, username_or_email):
+            messages.error(request, "Too many failed login attempts. Please try again in a few minutes.")
+            return redirect('login')
 
-        # Try username first
+        # The backend matches either the username or the email in one query
         user = authenticate(request, username=username_or_email, password=password)
-        if not user:
-            # Try email
-            try:
-                possible_user = User.objects.get(email=username_or_email)
-                user = authenticate(request, username=possible_user.username, password=password)
-            except User.DoesNotExist:
-                user = None
 
         if user:
             login(request, user)
@@ -211,7 +98,7 @@ def login_view(request):
             messages.error(request, "Invalid credentials or user does not exist.")
             return redirect('login')
 
-    return render(request, 'restaurant/index.html')
+    return render(request, 'restaurant/index.html', home_menu_context(get_menu_snapshot()))
 
 def logout_view(request):
     logout(request)
@@ -224,26 +111,39 @@ def book_table(request):
         # Get form data
         name = request.POST.get('name')
         phone = request.POST.get('phone')
-        date = request.POST.get('date')
-        time = request.POST.get('time')
+        date_str = request.POST.get('date')
+        time_str = request.POST.get('time')
         guests = request.POST.get('guests')
         special_requests = request.POST.get('special_requests')
 
-        # Create reservation and associate it with the current user
-        reservation = Reservation.objects.create(
-            user=request.user,  # Associate with current user
-            name=name,
-            phone=phone,
-            date=date,
-            time=time,
-            guests=guests,
-            special_requests=special_requests
-        )
+        try:
+            reservation_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            reservation_time = datetime.strptime(time_str, '%H:%M').time()
+            guests = int(guests)
+        except (TypeError, ValueError):
+            messages.error(request, 'Invalid date, time or number of guests')
+            return redirect('home')
+
+        with transaction.atomic():
+            if not has_capacity(reservation_date, reservation_time, guests):
+                messages.error(request, 'Sorry, we are fully booked at that time. Please choose another slot.')
+                return redirect('home')
+
+            # Create reservation and associate it with the current user
+            reservation = Reservation.objects.create(
+                user=request.user,  # Associate with current user
+                name=name,
+                phone=phone,
+                date=reservation_date,
+                time=reservation_time,
+                guests=guests,
+                special_requests=special_requests
+            )
 
         messages.success(request, 'Your reservation has been confirmed!')
         return redirect('my_reservations')
 
-    return render(request, 'restaurant/index.html')
+    return render(request, 'restaurant/index.html', home_menu_context(get_menu_snapshot()))
 
 @login_required
 def my_reservations(request):
@@ -275,19 +175,25 @@ def modify_reservation(request, reservation_id):
             reservation_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             # Convert time string to time object
             reservation_time = datetime.strptime(time_str, '%H:%M').time()
-
-            # Update reservation
-            reservation.name = name
-            reservation.phone = phone
-            reservation.date = reservation_date
-            reservation.time = reservation_time
-            reservation.guests = guests
-            reservation.special_requests = special_requests
-            reservation.save()
+            guests = int(guests)
+
+            with transaction.atomic():
+                if not has_capacity(reservation_date, reservation_time, guests, exclude_id=reservation.id):
+                    messages.error(request, 'Sorry, we are fully booked at that time. Please choose another slot.')
+                    return redirect('modify_reservation', reservation_id=reservation.id)
+
+                # Update reservation
+                reservation.name = name
+                reservation.phone = phone
+                reservation.date = reservation_date
+                reservation.time = reservation_time
+                reservation.guests = guests
+                reservation.special_requests = special_requests
+                reservation.save()
 
             messages.success(request, 'Reservation updated successfully!')
             return redirect('my_reservations')
-        except ValueError as e:
+        except (TypeError, ValueError) as e:
             messages.error(request, 'Invalid date or time format')
             return redirect('my_reservations')
 
@@ -298,6 +204,67 @@ def modify_reservation(request, reservation_id):
     }
     return render(request, 'restaurant/modify_reservation.html', context)
 
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition of the per-view request histograms"""
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@require_GET
+def availability_api(request):
+    """Remaining covers per bookable time slot: ?date=YYYY-MM-DD"""
+    try:
+        day = datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'date must be YYYY-MM-DD'}, status=400)
+
+    capacity, slots = day_availability(day)
+    return JsonResponse({
+        'date': day.isoformat(),
+        'capacity': capacity,
+        'slots': [
+            {'time': slot.strftime('%H:%M'), 'remaining': remaining}
+            for slot, remaining in slots.items()
+        ],
+    })
+
+MENU_SEARCH_LIMIT = 50
+
+@require_GET
+def menu_search_api(request):
+    """Ranked menu search: ?q=words[&category=starters&category=mains][&limit=20]"""
+    categories = request.GET.getlist('category')
+    valid = {code for code, _ in MenuItem.CATEGORY_CHOICES}
+    if not set(categories) <= valid:
+        return JsonResponse({'error': f"category must be one of {', '.join(sorted(valid))}"}, status=400)
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return JsonResponse({'error': 'limit must be a positive integer'}, status=400)
+    limit = min(limit, MENU_SEARCH_LIMIT)
+
+    query = request.GET.get('q', '')
+    results = get_menu_snapshot().search_index.search(query, categories=categories, limit=limit)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'category': item.category,
+                'price': str(item.price),
+                'image': item.image,
+                'score': round(score, 4),
+            }
+            for item, score in results
+        ],
+    })
+
 @login_required
 def cancel_reservation(request, reservation_id):
     if request.method == 'POST':
@@ -316,20 +283,7 @@ def cancel_reservation(request, reservation_id):
 
 def online_order(request):
     """Display the online ordering page"""
-    menu_items = MenuItem.objects.all().prefetch_related('options')
-    menu_by_category = {}
-    
-    for item in menu_items:
-        if item.category not in menu_by_category:
-            menu_by_category[item.category] = []
-        menu_by_category[item.category].append({
-            'id': item.id,
-            'name': item.name,
-            'description': item.description,
-            'price': item.price,
-            'image': item.image,
-            'options': list(item.options.all())
-        })
+    menu_by_category = get_menu_snapshot().menu_by_category
 
     # Calculate tax and total if there's a cart
     try:
@@ -372,6 +326,11 @@ def add_to_cart(request):
         menu_item_id = data.get('menu_item_id')
         quantity = int(data.get('quantity', 1))
         selected_options = data.get('options', {})
+        if quantity < 1:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Quantity must be at least 1'
+            }, status=400)
         
         # Validate menu item exists
         menu_item = MenuItem.objects.get(id=menu_item_id)
@@ -386,32 +345,13 @@ def add_to_cart(request):
             }
         )
         
-        # Create or update order item
-        order_item, created = OrderItem.objects.get_or_create(
-            order=cart,
-            menu_item=menu_item,
-            defaults={
-                'quantity': quantity,
-                'selected_options': selected_options,
-                'item_total': Decimal('0.00')  # Will be calculated in save()
-            }
-        )
-        
-        if not created:
-            order_item.quantity += quantity
-            order_item.selected_options.update(selected_options)
-        
-        order_item.save()
-        
-        # Update order total
-        cart.total_amount = sum(item.item_total for item in cart.items.all())
-        cart.save()
+        cart.add_item(menu_item, quantity, selected_options)
         
         return JsonResponse({
             'status': 'success',
             'message': 'Item added to cart',
             'cart_total': str(cart.total_amount),
-            'cart_count': cart.items.count()
+            'cart_count': cart.item_count
         })
         
     except MenuItem.DoesNotExist:
@@ -486,22 +426,14 @@ def update_cart(request):
     quantity = data.get('quantity', 0)
     
     try:
-        order_item = OrderItem.objects.get(
+        order_item = OrderItem.objects.select_related('order').get(
             id=item_id,
             order__user=request.user,
             order__status='pending'
         )
         
-        if quantity > 0:
-            order_item.quantity = quantity
-            order_item.save()
-        else:
-            order_item.delete()
-            
-        # Update order total
         order = order_item.order
-        order.total_amount = sum(item.item_total for item in order.items.all())
-        order.save()
+        order.set_item_quantity(order_item, quantity)
         
         return JsonResponse({
             'status': 'success',
@@ -550,11 +482,13 @@ def checkout(request):
             pickup_datetime = datetime.strptime(pickup_time, '%Y-%m-%d %H:%M')
             pickup_time_aware = timezone.make_aware(pickup_datetime)
             
-            # Update order
+            # Update order; the confirmation email goes out through the outbox
             cart.pickup_time = pickup_time_aware
             cart.special_instructions = special_instructions
             cart.status = 'confirmed'
-            cart.save()
+            with transaction.atomic():
+                cart.save()
+                OutboxMessage.enqueue('order_confirmation', order_id=cart.id)
             
             messages.success(request, 'Order placed successfully!')
             return redirect('order_confirmation', order_id=cart.id)
@@ -580,17 +514,70 @@ def order_confirmation(request, order_id):
     }
     return render(request, 'restaurant/order_confirmation.html', context)
 
+ORDER_HISTORY_PAGE_SIZE = 10
+
+def _history_cursor(order):
+    """Encode an order's (created_at, id) position as a keyset cursor"""
+    return f"{order.created_at.isoformat()}_{order.id}"
+
+def _parse_history_cursor(cursor):
+    """Decode a keyset cursor, returning (created_at, id) or None if malformed"""
+    created_at, _, order_id = (cursor or '').rpartition('_')
+    created_at = parse_datetime(created_at) if created_at else None
+    if created_at is None or not order_id.isdigit():
+        return None
+    return created_at, int(order_id)
+
 @login_required
 def order_history(request):
-    """Display user's order history"""
+    """Display user's order history, newest first, one keyset page at a time"""
     orders = Order.objects.filter(
         user=request.user
     ).exclude(
         status='pending'
-    ).order_by('-created_at')
+    )
+
+    # Optional filters: ?status=<status> and ?favorites=1
+    status = request.GET.get('status')
+    if status in dict(Order.STATUS_CHOICES) and status != 'pending':
+        orders = orders.filter(status=status)
+    else:
+        status = None
+    favorites = request.GET.get('favorites') == '1'
+    if favorites:
+        orders = orders.filter(is_favorite=True)
+
+    # Keyset pagination on (created_at, id) so deep pages cost the same as the first
+    cursor = _parse_history_cursor(request.GET.get('before'))
+    if cursor:
+        created_at, order_id = cursor
+        orders = orders.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+        )
+
+    orders = list(
+        orders.order_by('-created_at', '-id').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+        )[:ORDER_HISTORY_PAGE_SIZE + 1]
+    )
+    next_query = None
+    if len(orders) > ORDER_HISTORY_PAGE_SIZE:
+        orders = orders[:ORDER_HISTORY_PAGE_SIZE]
+        params = request.GET.copy()
+        params['before'] = _history_cursor(orders[-1])
+        next_query = params.urlencode()
+
+    filter_params = request.GET.copy()
+    filter_params.pop('before', None)
 
     context = {
-        'orders': orders
+        'orders': orders,
+        'status_filter': status,
+        'favorites_only': favorites,
+        'status_choices': [choice for choice in Order.STATUS_CHOICES if choice[0] != 'pending'],
+        'next_query': next_query,
+        'is_first_page': cursor is None,
+        'first_page_query': filter_params.urlencode(),
     }
     return render(request, 'restaurant/order_history.html', context)
 
@@ -651,89 +638,89 @@ def toggle_favorite_order(request, order_id):
     order.save()
     return JsonResponse({'status': 'success', 'is_favorite': order.is_favorite})
 
-@login_required
-def reorder(request, order_id):
-    """Create a new order based on a previous order"""
-    old_order = get_object_or_404(Order, id=order_id, user=request.user)
-    
-    # Create new cart with current time + 30 minutes for pickup
-    pickup_time = timezone.localtime(timezone.now() + timedelta(minutes=30))
-    
-    new_order = Order.objects.create(
+def _reorder_into_cart(request, order_ids):
+    """Merge the lines of the user's past orders into their single pending cart"""
+    lines = list(
+        OrderItem.objects.filter(order_id__in=order_ids, order__user=request.user)
+        .exclude(order__status='pending')
+        .select_related('menu_item')
+    )
+    if not lines:
+        messages.error(request, 'No items found to reorder.')
+        return redirect('order_history')
+
+    # Reuse the existing cart rather than starting a second pending order
+    cart, created = Order.objects.get_or_create(
         user=request.user,
         status='pending',
-        total_amount=Decimal('0.00'),
-        pickup_time=pickup_time
+        defaults={
+            'total_amount': Decimal('0.00'),
+            'pickup_time': timezone.localtime(timezone.now() + timedelta(minutes=30))
+        }
     )
-    
-    # Copy items from old order
-    for item in old_order.items.all():
-        OrderItem.objects.create(
-            order=new_order,
-            menu_item=item.menu_item,
-            quantity=item.quantity,
-            selected_options=item.selected_options,
-            item_total=item.item_total
-        )
-    
-    # Update total
-    new_order.total_amount = sum(item.item_total for item in new_order.items.all())
-    new_order.save()
-    
-    messages.success(request, 'Items added to cart!')
+
+    added = cart.merge_lines(lines)
+    if added:
+        messages.success(request, 'Items added to cart!')
+    if any(line.menu_item is None for line in lines):
+        messages.warning(request, 'Some items are no longer on the menu and were skipped.')
     return redirect('view_cart')
 
+@login_required
+def reorder(request, order_id):
+    """Add the items of a previous order to the cart at current prices"""
+    get_object_or_404(Order, id=order_id, user=request.user)
+    return _reorder_into_cart(request, [order_id])
+
+@require_POST
+@login_required
+def reorder_multiple(request):
+    """Add the items of several previous orders to the cart in one go"""
+    try:
+        order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids')]
+    except ValueError:
+        order_ids = []
+    if not order_ids:
+        messages.error(request, 'Select at least one order to reorder.')
+        return redirect('order_history')
+    return _reorder_into_cart(request, order_ids)
+
+@require_POST
 @login_required
 def create_payment_intent(request, order_id):
     """Create a payment intent for Stripe"""
+    order = get_object_or_404(Order, id=order_id, user=request.user)
     try:
-        order = Order.objects.get(id=order_id, user=request.user)
-        
-        # Create a PaymentIntent with the order amount and currency
-        intent = stripe.PaymentIntent.create(
-            amount=int(order.get_total_with_tax() * 100),
-            currency='inr',  # Changed to Indian Rupees
-            metadata={
-                'order_id': order.id,
-                'user_id': request.user.id
-            }
-        )
-        
-        order.stripe_payment_intent = intent.id
-        order.save()
-        
-        return JsonResponse({
-            'clientSecret': intent.client_secret,
-            'publicKey': settings.STRIPE_PUBLISHABLE_KEY
-        })
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=403)
+        # Pooled, timeout-bounded and retried; fails fast while Stripe is down
+        intent = get_payment_client().create_payment_intent(order)
+    except PaymentUnavailable:
+        return JsonResponse({'error': 'Payments are temporarily unavailable. Please try again shortly.'}, status=503)
+    except stripe.StripeError as e:
+        return JsonResponse({'error': e.user_message or str(e)}, status=402)
+
+    return JsonResponse({
+        'clientSecret': intent.client_secret,
+        'publicKey': settings.STRIPE_PUBLISHABLE_KEY
+    })
 
+@csrf_exempt
 @require_POST
 def stripe_webhook(request):
-    """Handle Stripe webhooks"""
+    """Verify a Stripe event, record it and queue its handling"""
     try:
         event = stripe.Webhook.construct_event(
-            request.body, request.META['HTTP_STRIPE_SIGNATURE'], 
+            request.body, request.META.get('HTTP_STRIPE_SIGNATURE', ''),
             settings.STRIPE_WEBHOOK_SECRET
         )
-
-        if event.type == 'payment_intent.succeeded':
-            payment_intent = event.data.object
-            order_id = payment_intent.metadata.get('order_id')
-            
-            # Update order status
-            order = Order.objects.get(id=order_id)
-            order.payment_status = 'paid'
-            order.update_status('confirmed')  # Use the new method
-            
-            # Send confirmation email
-            send_order_confirmation(order)
-            
-        return JsonResponse({'status': 'success'})
-    except Exception as e:
+    except (ValueError, stripe.SignatureVerificationError) as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+    # Stripe retries until it gets a 2xx, so duplicates are acknowledged too
+    data_object = json.loads(request.body)['data']['object']
+    if not accept_stripe_event(event.id, event.type, data_object):
+        return JsonResponse({'status': 'duplicate'})
+    return JsonResponse({'status': 'success'})
+
 @login_required
 def update_order_status(request, order_id):
     """Update order status (for staff/admin)"""
@@ -753,15 +740,170 @@ def update_order_status(request, order_id):
     except Order.DoesNotExist:
         return JsonResponse({'error': 'Order not found'}, status=404)
 
+SALES_REPORT_MAX_DAYS = 366
+
+@login_required
+def sales_dashboard(request):
+    """Sales for a date range (staff only), read from the rollup tables"""
+    if not request.user.is_staff:
+        messages.error(request, 'Only staff can view sales reports.')
+        return redirect('home')
+
+    today = timezone.localdate()
+    try:
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else today
+        start = (datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+                 if request.GET.get('start') else end - timedelta(days=29))
+    except ValueError:
+        messages.error(request, 'Dates must be YYYY-MM-DD.')
+        start, end = today - timedelta(days=29), today
+    if start > end:
+        start, end = end, start
+    start = max(start, end - timedelta(days=SALES_REPORT_MAX_DAYS - 1))
+
+    report = sales_report(start, end)
+    context = {
+        **report,
+        'start': start,
+        'end': end,
+        'max_day_revenue': max((day['revenue'] for day in report['days']), default=0),
+        'max_hour_revenue': max((hour['revenue'] for hour in report['by_hour']), default=0),
+    }
+    return render(request, 'restaurant/sales_dashboard.html', context)
+
+@require_POST
+@login_required
+def bulk_update_order_status(request):
+    """Move many orders to one status in a single statement (for kitchen staff)"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        order_ids = [int(order_id) for order_id in data.get('order_ids', [])]
+        new_status = data.get('status')
+    except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+
+    if not Order.allowed_sources(new_status):
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+
+    updated, rejected = Order.bulk_update_status(order_ids, new_status)
+    return JsonResponse({
+        'status': 'success',
+        'orders': [serialize_order_status(order) for order in updated],
+        'rejected': rejected,
+    })
+
+ORDER_STATUS_FIELDS = ('id', 'status', 'updated_at', 'confirmed_at', 'preparing_at', 'ready_at', 'completed_at')
+ORDER_STATUS_BATCH_LIMIT = 100
+
+def _conditional_json(request, payload_func, etag, last_modified):
+    """Return 304 when the client's validators still match, else the JSON body"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(payload_func())
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@require_GET
 def order_status_api(request, order_id):
+    order = Order.objects.only(*ORDER_STATUS_FIELDS).filter(id=order_id).first()
+    if order is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    return _conditional_json(
+        request,
+        lambda: serialize_order_status(order),
+        etag=quote_etag(f"{order.id}-{order.updated_at.timestamp()}"),
+        last_modified=int(order.updated_at.timestamp()),
+    )
+
+@require_GET
+def order_status_batch_api(request):
+    """Statuses for many orders in one query: ?ids=1,2,3 (own orders, or any for staff)"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=401)
     try:
-        order = Order.objects.get(id=order_id)
-        return JsonResponse({
-            'status': order.status,
-            'confirmed_at': order.confirmed_at.isoformat() if order.confirmed_at else None,
-            'preparing_at': order.preparing_at.isoformat() if order.preparing_at else None,
-            'ready_at': order.ready_at.isoformat() if order.ready_at else None,
-            'completed_at': order.completed_at.isoformat() if order.completed_at else None,
-        })
-    except Order.DoesNotExist:
+        ids = sorted({int(value) for value in request.GET.get('ids', '').split(',') if value.strip()})
+    except ValueError:
+        return JsonResponse({'error': 'ids must be a comma-separated list of integers'}, status=400)
+    if not ids or len(ids) > ORDER_STATUS_BATCH_LIMIT:
+        return JsonResponse({'error': f'Pass between 1 and {ORDER_STATUS_BATCH_LIMIT} ids'}, status=400)
+
+    orders = Order.objects.only(*ORDER_STATUS_FIELDS).filter(id__in=ids)
+    if not request.user.is_staff:
+        orders = orders.filter(user=request.user)
+    orders = list(orders.order_by('id'))
+
+    found = {order.id for order in orders}
+    fingerprint = ','.join(f"{order.id}:{order.updated_at.timestamp()}" for order in orders)
+    last_modified = max((int(order.updated_at.timestamp()) for order in orders), default=None)
+    return _conditional_json(
+        request,
+        lambda: {
+            'orders': [serialize_order_status(order) for order in orders],
+            'missing': [order_id for order_id in ids if order_id not in found],
+        },
+        etag=quote_etag(hashlib.md5(f"{ids}|{fingerprint}".encode()).hexdigest()),
+        last_modified=last_modified,
+    )
+
+ORDER_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+
+def _sse_event(payload):
+    return f"event: status\ndata: {json.dumps(payload)}\n\n"
+
+async def order_status_stream(request, order_id):
+    """
+    Server-sent events stream of an order's status. The order is read
+    once on connect; after that the connection waits on the in-process
+    hub and costs no queries until the status changes. Streaming needs
+    an ASGI server; under WSGI the current status is returned as plain
+    JSON, which makes the page fall back to polling.
+    """
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'error': 'Login required'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held until the order finishes
+        order = await Order.objects.filter(id=order_id, user=user).afirst()
+        if order is None:
+            return JsonResponse({'error': 'Order not found'}, status=404)
+        return JsonResponse(serialize_order_status(order))
+
+    # Subscribe before reading the snapshot so no update slips in between
+    entry = hub.subscribe(order_id)
+    try:
+        order = await Order.objects.filter(id=order_id, user=user).afirst()
+    except BaseException:
+        hub.unsubscribe(order_id, entry)
+        raise
+    if order is None:
+        hub.unsubscribe(order_id, entry)
         return JsonResponse({'error': 'Order not found'}, status=404)
+
+    async def stream():
+        try:
+            yield _sse_event(serialize_order_status(order))
+            if order.status in TERMINAL_STATUSES:
+                return
+            _, queue = entry
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), ORDER_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_event(payload)
+                if payload['status'] in TERMINAL_STATUSES:
+                    return
+        finally:
+            hub.unsubscribe(order_id, entry)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response